@@ -4,17 +4,24 @@ PHISHES Digital Platform - Analysis Module
 This module provides functions for analyzing downloaded datasets.
 """
 
-from .catchment import (
-    CATCHMENT_RESTRICTIONS,
-    EUROPE_AOI,
-    compute_catchment_weights,
-    create_catchment_from_extent,
-    load_catchment,
-    reproject_catchment,
-    validate_catchment_gdf,
-)
-from .timeseries import compute_anomalies, compute_basin_average
-from .visualization import plot_catchment, plot_spatial_map, plot_time_series
+import importlib
+
+# Exported names and the submodule defining them; submodules are imported on first use
+# so that importing the package does not load geopandas, shapely or matplotlib.
+_LAZY = {
+    "CATCHMENT_RESTRICTIONS": "catchment",
+    "EUROPE_AOI": "catchment",
+    "compute_catchment_weights": "catchment",
+    "create_catchment_from_extent": "catchment",
+    "load_catchment": "catchment",
+    "reproject_catchment": "catchment",
+    "validate_catchment_gdf": "catchment",
+    "compute_anomalies": "timeseries",
+    "compute_basin_average": "timeseries",
+    "plot_catchment": "visualization",
+    "plot_spatial_map": "visualization",
+    "plot_time_series": "visualization",
+}
 
 __all__ = [
     "CATCHMENT_RESTRICTIONS",
@@ -30,3 +37,14 @@ __all__ = [
     "reproject_catchment",
     "validate_catchment_gdf",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(f".{_LAZY[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module 'analysis' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(__all__)
@@ -4,16 +4,22 @@ PHISHES Digital Platform - Catchment Processing Functions
 Functions for loading, reprojecting, and processing catchment geometries.
 """
 
+import functools
+import logging
+import weakref
 from pathlib import Path
 from typing import Iterable, Optional, Tuple, Union
 
 import geopandas as gpd
 import numpy as np
+import shapely
 import shapely.geometry
 import xarray as xr
 from shapely.ops import unary_union
 
-from ..core.utils import get_grid_resolution
+from ..core.utils import get_grid_resolution, get_transformer
+
+logger = logging.getLogger(__name__)
 
 # European Area of Interest bounding box (EPSG:4326)
 EUROPE_AOI = {
@@ -34,32 +40,25 @@ CATCHMENT_RESTRICTIONS = {
 
 def _get_geometry_type(gdf: gpd.GeoDataFrame) -> str:
     """Determine the dominant geometry type in a GeoDataFrame."""
-    geom_types = gdf.geometry.geom_type.unique()
-
-    # Check for polygons first
-    polygon_types = {"Polygon", "MultiPolygon"}
-    if any(gt in polygon_types for gt in geom_types):
-        return "polygon"
-
-    # Check for lines
-    line_types = {"LineString", "MultiLineString"}
-    if any(gt in line_types for gt in geom_types):
-        return "line"
+    type_ids = shapely.get_type_id(gdf.geometry.values)
 
-    # Check for points
-    point_types = {"Point", "MultiPoint"}
-    if any(gt in point_types for gt in geom_types):
-        return "point"
+    # Polygons first, then lines, then points (single and multi-part type ids)
+    for geom_type, ids in (("polygon", (3, 6)), ("line", (1, 5)), ("point", (0, 4))):
+        if np.isin(type_ids, ids).any():
+            return geom_type
 
     return "unknown"
 
 
 def _buffer_geometry(
     gdf: gpd.GeoDataFrame, buffer_distance_m: float = CATCHMENT_RESTRICTIONS["buffer_distance_m"]
-) -> gpd.GeoDataFrame:
+) -> Tuple[gpd.GeoDataFrame, str]:
     """
     Buffer point/line geometries to create polygon catchment areas.
 
+    The buffered geometries are left in EPSG:3035 so callers reproject them only
+    once, to whatever CRS they need next.
+
     Parameters
     ----------
     gdf : GeoDataFrame
@@ -69,33 +68,40 @@ def _buffer_geometry(
 
     Returns
     -------
-    GeoDataFrame
-        GeoDataFrame with buffered polygon geometries.
+    tuple
+        (GeoDataFrame with buffered polygon geometries, its CRS "EPSG:3035")
     """
-    original_crs = gdf.crs
-
     # Project to a meter-based CRS for accurate buffering
     # Use EPSG:3035 (ETRS89-LAEA Europe) for European data
     gdf_projected = gdf.to_crs("EPSG:3035")
     gdf_projected["geometry"] = gdf_projected.geometry.buffer(buffer_distance_m)
 
-    # Project back to original CRS
-    gdf_buffered = gdf_projected.to_crs(original_crs)
+    logger.info("Buffered geometries by %sm", buffer_distance_m)
+    return gdf_projected, "EPSG:3035"
+
 
-    print(f"Buffered geometries by {buffer_distance_m}m")
-    return gdf_buffered
+def _reproject_geometry(
+    geom: shapely.geometry.base.BaseGeometry, src_crs, dst_crs
+) -> shapely.geometry.base.BaseGeometry:
+    """Reproject a single shapely geometry, skipping the transform if the CRS match."""
+    if src_crs == dst_crs:
+        return geom
+    transformer = get_transformer(src_crs, dst_crs)
+    return shapely.transform(
+        geom, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1]))
+    )
 
 
 def _validate_europe_aoi(
-    gdf: gpd.GeoDataFrame, min_overlap_fraction: float = 0.1
+    geom_4326: shapely.geometry.base.BaseGeometry, min_overlap_fraction: float = 0.1
 ) -> Tuple[bool, float, str]:
     """
     Validate that catchment overlaps with European Area of Interest.
 
     Parameters
     ----------
-    gdf : GeoDataFrame
-        Catchment geometry (must be in EPSG:4326).
+    geom_4326 : shapely geometry
+        Merged catchment geometry in EPSG:4326.
     min_overlap_fraction : float
         Minimum fraction of catchment that must overlap with Europe AOI.
 
@@ -104,26 +110,34 @@ def _validate_europe_aoi(
     tuple
         (is_valid, overlap_fraction, message)
     """
-    # Ensure we're in WGS84
-    if gdf.crs is None:
-        return False, 0.0, "Catchment has no CRS defined"
-
-    gdf_4326 = gdf.to_crs("EPSG:4326") if gdf.crs != "EPSG:4326" else gdf
+    # Decide from the bounds alone when they are fully outside or inside the AOI
+    minx, miny, maxx, maxy = geom_4326.bounds
+    if (
+        maxx < EUROPE_AOI["min_lon"]
+        or minx > EUROPE_AOI["max_lon"]
+        or maxy < EUROPE_AOI["min_lat"]
+        or miny > EUROPE_AOI["max_lat"]
+    ):
+        return False, 0.0, "Catchment does not overlap with European AOI"
+    if (
+        minx >= EUROPE_AOI["min_lon"]
+        and maxx <= EUROPE_AOI["max_lon"]
+        and miny >= EUROPE_AOI["min_lat"]
+        and maxy <= EUROPE_AOI["max_lat"]
+    ):
+        return True, 1.0, f"Catchment overlaps {1.0:.1%} with European AOI"
 
     # Create Europe AOI box
     europe_box = shapely.geometry.box(
         EUROPE_AOI["min_lon"], EUROPE_AOI["min_lat"], EUROPE_AOI["max_lon"], EUROPE_AOI["max_lat"]
     )
 
-    # Get catchment bounds
-    catchment_geom = unary_union(gdf_4326.geometry)
-
-    if not catchment_geom.intersects(europe_box):
+    if not geom_4326.intersects(europe_box):
         return False, 0.0, "Catchment does not overlap with European AOI"
 
     # Calculate overlap fraction
-    intersection = catchment_geom.intersection(europe_box)
-    overlap_fraction = intersection.area / catchment_geom.area if catchment_geom.area > 0 else 0
+    intersection = geom_4326.intersection(europe_box)
+    overlap_fraction = intersection.area / geom_4326.area if geom_4326.area > 0 else 0
 
     if overlap_fraction < min_overlap_fraction:
         return (
@@ -135,24 +149,23 @@ def _validate_europe_aoi(
     return True, overlap_fraction, f"Catchment overlaps {overlap_fraction:.1%} with European AOI"
 
 
-def _validate_catchment_size(gdf: gpd.GeoDataFrame) -> Tuple[bool, float, str]:
+def _validate_catchment_size(
+    geom_3035: shapely.geometry.base.BaseGeometry,
+) -> Tuple[bool, float, str]:
     """
     Validate catchment area is within acceptable limits.
 
     Parameters
     ----------
-    gdf : GeoDataFrame
-        Catchment geometry.
+    geom_3035 : shapely geometry
+        Merged catchment geometry in the equal-area EPSG:3035.
 
     Returns
     -------
     tuple
         (is_valid, area_km2, message)
     """
-    # Project to equal-area CRS for accurate area calculation
-    gdf_projected = gdf.to_crs("EPSG:3035")
-    area_m2 = gdf_projected.geometry.area.sum()
-    area_km2 = area_m2 / 1e6
+    area_km2 = geom_3035.area / 1e6
 
     min_area = CATCHMENT_RESTRICTIONS["min_area_km2"]
     max_area = CATCHMENT_RESTRICTIONS["max_area_km2"]
@@ -219,7 +232,8 @@ def load_catchment(
     Load catchment shapefile and optionally reproject and merge features.
 
     Supports polygon, line, and point geometries. Points and lines are
-    automatically buffered to create polygon catchment areas.
+    automatically buffered to create polygon catchment areas. Results for a file
+    are cached until the file is modified; each call returns a copy.
 
     Parameters
     ----------
@@ -254,21 +268,64 @@ def load_catchment(
     ValueError
         If shapefile is empty or fails validation.
     """
+    options = (target_crs, merge_features, validate_aoi, validate_size, buffer_points_lines)
     if extent is not None:
         if extent_crs is None:
             raise ValueError("extent_crs must be provided when using extent")
-        print("Loading catchment from manual extent")
+        logger.info("Loading catchment from manual extent")
         gdf = create_catchment_from_extent(extent, extent_crs)
-    else:
-        if shp_path is None:
-            raise ValueError("Either shp_path or extent must be provided")
-        shp_path = Path(shp_path)
-        if not shp_path.exists():
-            raise FileNotFoundError(f"Catchment shapefile not found: {shp_path}")
-
-        print(f"Loading catchment from: {shp_path}")
+        return _process_catchment(gdf, *options)
+
+    if shp_path is None:
+        raise ValueError("Either shp_path or extent must be provided")
+    shp_path = Path(shp_path)
+    if not shp_path.exists():
+        raise FileNotFoundError(f"Catchment shapefile not found: {shp_path}")
+
+    # Cached per file version and options; hand out a copy so callers can't mutate it
+    gdf, merged_geom = _load_catchment_file(str(shp_path), _catchment_mtime_ns(shp_path), *options)
+    return gdf.copy(), merged_geom
+
+
+def _catchment_mtime_ns(shp_path: Path) -> int:
+    """Latest modification time of a catchment file and its shapefile sidecars."""
+    paths = [shp_path]
+    if shp_path.suffix.lower() == ".shp":
+        paths += [shp_path.with_suffix(suffix) for suffix in (".shx", ".dbf", ".prj", ".cpg")]
+    return max(path.stat().st_mtime_ns for path in paths if path.exists())
+
+
+@functools.lru_cache(maxsize=16)
+def _load_catchment_file(
+    shp_path: str,
+    mtime_ns: int,
+    target_crs: Optional[str],
+    merge_features: bool,
+    validate_aoi: bool,
+    validate_size: bool,
+    buffer_points_lines: bool,
+) -> Tuple[gpd.GeoDataFrame, Optional[shapely.geometry.base.BaseGeometry]]:
+    """Read and process a catchment file (cached on path, modification time and options)."""
+    logger.info("Loading catchment from: %s", shp_path)
+    try:
+        gdf = gpd.read_file(shp_path, engine="pyogrio")
+    except (ImportError, ValueError):
+        # pyogrio not installed or not supported by this geopandas version
         gdf = gpd.read_file(shp_path)
+    return _process_catchment(
+        gdf, target_crs, merge_features, validate_aoi, validate_size, buffer_points_lines
+    )
+
 
+def _process_catchment(
+    gdf: gpd.GeoDataFrame,
+    target_crs: Optional[str],
+    merge_features: bool,
+    validate_aoi: bool,
+    validate_size: bool,
+    buffer_points_lines: bool,
+) -> Tuple[gpd.GeoDataFrame, Optional[shapely.geometry.base.BaseGeometry]]:
+    """Validate, buffer, reproject and merge a loaded catchment (see :func:`load_catchment`)."""
     if len(gdf) == 0:
         raise ValueError("Catchment shapefile is empty")
 
@@ -277,17 +334,20 @@ def load_catchment(
     if len(gdf) > max_features:
         raise ValueError(f"Too many features ({len(gdf)}). Maximum allowed: {max_features}")
 
-    print(f"Catchment CRS: {gdf.crs}")
-    print(f"Number of features: {len(gdf)}")
+    logger.info("Catchment CRS: %s", gdf.crs)
+    logger.info("Number of features: %d", len(gdf))
 
     # Detect and handle geometry type
     geom_type = _get_geometry_type(gdf)
-    print(f"Geometry type: {geom_type}")
+    logger.info("Geometry type: %s", geom_type)
 
+    # Reprojection is deferred until validation is done, so buffered geometries
+    # are only transformed once from EPSG:3035 to the output CRS
+    output_crs = target_crs or gdf.crs
     if geom_type in ("point", "line"):
         if buffer_points_lines:
-            print(f"Converting {geom_type} geometry to polygon via buffering")
-            gdf = _buffer_geometry(gdf)
+            logger.info("Converting %s geometry to polygon via buffering", geom_type)
+            gdf, current_crs = _buffer_geometry(gdf)
         else:
             raise ValueError(
                 f"Catchment contains {geom_type} geometries. "
@@ -295,37 +355,56 @@ def load_catchment(
             )
     elif geom_type == "unknown":
         raise ValueError("Catchment contains unsupported geometry types")
+    else:
+        current_crs = gdf.crs
 
-    # Reproject if requested
-    if target_crs and gdf.crs != target_crs:
-        print(f"Reprojecting catchment to {target_crs}")
-        gdf = gdf.to_crs(target_crs)
+    # Union the features once; both validators and the merged output reuse it
+    merged_geom = None
+    if validate_aoi or validate_size or (merge_features and len(gdf) > 1):
+        merged_geom = unary_union(gdf.geometry.values)
 
     # Validate European AOI overlap
     if validate_aoi:
-        is_valid, overlap, message = _validate_europe_aoi(gdf)
-        print(f"AOI validation: {message}")
+        if current_crs is None:
+            raise ValueError("AOI validation failed: Catchment has no CRS defined")
+        geom_4326 = _reproject_geometry(merged_geom, current_crs, "EPSG:4326")
+        is_valid, overlap, message = _validate_europe_aoi(geom_4326)
+        logger.info("AOI validation: %s", message)
         if not is_valid:
             raise ValueError(f"AOI validation failed: {message}")
 
     # Validate catchment size
     if validate_size:
-        is_valid, area_km2, message = _validate_catchment_size(gdf)
-        print(message)
+        # Project to equal-area CRS for accurate area calculation
+        geom_3035 = _reproject_geometry(merged_geom, current_crs, "EPSG:3035")
+        is_valid, area_km2, message = _validate_catchment_size(geom_3035)
+        logger.info(message)
         if not is_valid:
             raise ValueError(f"Size validation failed: {message}")
 
+    # Reproject if requested (or back to the input CRS after buffering)
+    if output_crs is not None and current_crs != output_crs:
+        logger.info("Reprojecting catchment to %s", output_crs)
+        gdf = gdf.to_crs(output_crs)
+
     # Merge features if requested
-    merged_geom = None
     if merge_features and len(gdf) > 1:
-        print(f"Creating catchment outline from {len(gdf)} features")
-        merged_geom = unary_union(gdf.geometry)
+        logger.info("Creating catchment outline from %d features", len(gdf))
+        if output_crs is not None:
+            merged_geom = _reproject_geometry(merged_geom, current_crs, output_crs)
     elif len(gdf) == 1:
         merged_geom = gdf.geometry.iloc[0]
+    else:
+        merged_geom = None
 
     return gdf, merged_geom
 
 
+# Catchments returned by validate_catchment_gdf, keyed by id() because GeoDataFrames
+# are unhashable; entries disappear when the frame is garbage collected
+_validated_catchments = weakref.WeakValueDictionary()
+
+
 def validate_catchment_gdf(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     """
     Validate a pre-loaded catchment GeoDataFrame.
@@ -350,9 +429,14 @@ def validate_catchment_gdf(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     ValueError
         If catchment is empty or has no CRS.
     """
+    # Returned by an earlier call: nothing to check
+    if _validated_catchments.get(id(gdf)) is gdf:
+        return gdf
+
     # If already validated (single geometry with CRS), just log and return
     if len(gdf) == 1 and gdf.crs is not None:
-        print(f"Using pre-loaded catchment (CRS: {gdf.crs})")
+        logger.info("Using pre-loaded catchment (CRS: %s)", gdf.crs)
+        _validated_catchments[id(gdf)] = gdf
         return gdf
 
     # Minimal validation
@@ -364,11 +448,12 @@ def validate_catchment_gdf(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
 
     # Merge if needed
     if len(gdf) > 1:
-        print(f"Merging {len(gdf)} features into single geometry")
+        logger.info("Merging %d features into single geometry", len(gdf))
         merged_geometry = unary_union(gdf.geometry)
         gdf = gpd.GeoDataFrame({"geometry": [merged_geometry]}, crs=gdf.crs)
 
-    print(f"Catchment CRS: {gdf.crs}")
+    logger.info("Catchment CRS: %s", gdf.crs)
+    _validated_catchments[id(gdf)] = gdf
     return gdf
 
 
@@ -391,11 +476,92 @@ def reproject_catchment(gdf: gpd.GeoDataFrame, target_crs: str) -> gpd.GeoDataFr
     return gdf.to_crs(target_crs)
 
 
+def _exact_weights(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    lon_res: float,
+    lat_res: float,
+    catchment_geom: shapely.geometry.base.BaseGeometry,
+) -> np.ndarray:
+    """Covered fraction of each cell from exact shapely intersections."""
+    # Build all cell boxes in one vectorized call, broadcasting the 1-D cell edges
+    # to (lat, lon) rather than materialising a coordinate meshgrid
+    boxes = shapely.box(
+        (lon - lon_res / 2)[None, :],
+        (lat - lat_res / 2)[:, None],
+        (lon + lon_res / 2)[None, :],
+        (lat + lat_res / 2)[:, None],
+    ).ravel()
+
+    # Only intersect the cells the spatial index reports as touching the catchment
+    weights_flat = np.zeros(boxes.size, dtype=np.float32)
+    idx = shapely.STRtree(boxes).query(catchment_geom, predicate="intersects")
+    if idx.size:
+        cells = boxes[idx]
+
+        # Cells strictly inside the (prepared) catchment are fully covered
+        shapely.prepare(catchment_geom)
+        inside = shapely.contains_properly(catchment_geom, cells)
+        weights_flat[idx[inside]] = 1.0
+
+        edge_cells = cells[~inside]
+        intersection = shapely.intersection(edge_cells, catchment_geom)
+        weights_flat[idx[~inside]] = shapely.area(intersection) / shapely.area(edge_cells)
+    return weights_flat.reshape(lat.size, lon.size)
+
+
+def _rasterized_weights(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    lon_res: float,
+    lat_res: float,
+    catchment_geom: shapely.geometry.base.BaseGeometry,
+    supersample: int,
+) -> np.ndarray:
+    """Covered fraction of each cell from a ``supersample``-times finer rasterization."""
+    from affine import Affine
+    from rasterio.features import rasterize
+
+    # Signed steps so the raster rows/columns follow the coordinate order
+    lon_step = lon_res if lon.size < 2 or lon[1] > lon[0] else -lon_res
+    lat_step = lat_res if lat.size < 2 or lat[1] > lat[0] else -lat_res
+    k = supersample
+    transform = Affine(
+        lon_step / k, 0.0, lon[0] - lon_step / 2, 0.0, lat_step / k, lat[0] - lat_step / 2
+    )
+    mask = rasterize(
+        [(catchment_geom, 1)],
+        out_shape=(lat.size * k, lon.size * k),
+        transform=transform,
+        all_touched=False,
+        dtype="uint8",
+    )
+    return mask.reshape(lat.size, k, lon.size, k).mean(axis=(1, 3), dtype=np.float32)
+
+
+def _numba_weights(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    lon_res: float,
+    lat_res: float,
+    catchment_geom: shapely.geometry.base.BaseGeometry,
+) -> np.ndarray:
+    """Covered fraction of each cell from the numba polygon clipping kernel."""
+    try:
+        from .polyclip import polygon_cell_weights
+    except ImportError:
+        logger.warning("numba is not installed, using exact weights")
+        return _exact_weights(lon, lat, lon_res, lat_res, catchment_geom)
+    return polygon_cell_weights(lon, lat, lon_res, lat_res, catchment_geom)
+
+
 def compute_catchment_weights(
     ds: xr.Dataset,
     catchment_geom: shapely.geometry.base.BaseGeometry,
     lat_dim: str = "lat",
     lon_dim: str = "lon",
+    method: str = "exact",
+    supersample: int = 8,
 ) -> xr.DataArray:
     """
     Compute area-weighted intersection of grid cells with catchment.
@@ -413,11 +579,21 @@ def compute_catchment_weights(
         Name of latitude dimension.
     lon_dim : str, default "lon"
         Name of longitude dimension.
+    method : {"exact", "rasterize", "numba"}, default "exact"
+        "exact" intersects each touching cell with the catchment. "rasterize" burns
+        the catchment into a grid ``supersample`` times finer and block-averages it,
+        which is much faster for large grids at a resolution of ``1 / supersample**2``.
+        "numba" clips the catchment rings against every cell in a parallel JIT kernel
+        (requires the optional ``numba`` dependency, falls back to "exact").
+    supersample : int, default 8
+        Sub-cells per cell edge for ``method="rasterize"``.
 
     Returns
     -------
     xarray.DataArray
-        2D array of weights (0-1) for each grid cell.
+        2D float32 array of weights (0-1) for each grid cell. Single precision
+        (relative error ~1e-7) halves memory and keeps float32 data from being
+        upcast when weighted.
     """
     lat = ds[lat_dim].values
     lon = ds[lon_dim].values
@@ -426,29 +602,22 @@ def compute_catchment_weights(
     lat_res = get_grid_resolution(lat, default=0.1)
     lon_res = get_grid_resolution(lon, default=0.1)
 
-    print(f"Grid resolution: ~{lat_res:.4f}° lat x {lon_res:.4f}° lon")
+    logger.info("Grid resolution: ~%.4f° lat x %.4f° lon", lat_res, lon_res)
 
-    # Create meshgrid
-    lon_2d, lat_2d = np.meshgrid(lon, lat)
-
-    # Calculate intersection weights
-    weights = np.zeros(lon_2d.shape, dtype=float)
-
-    for i in range(lon_2d.shape[0]):
-        for j in range(lon_2d.shape[1]):
-            cell_box = shapely.geometry.box(
-                lon_2d[i, j] - lon_res / 2,
-                lat_2d[i, j] - lat_res / 2,
-                lon_2d[i, j] + lon_res / 2,
-                lat_2d[i, j] + lat_res / 2,
-            )
-            if cell_box.intersects(catchment_geom):
-                intersection = cell_box.intersection(catchment_geom)
-                weights[i, j] = intersection.area / cell_box.area
+    if method == "exact":
+        weights = _exact_weights(lon, lat, lon_res, lat_res, catchment_geom)
+    elif method == "rasterize":
+        weights = _rasterized_weights(lon, lat, lon_res, lat_res, catchment_geom, supersample)
+    elif method == "numba":
+        weights = _numba_weights(lon, lat, lon_res, lat_res, catchment_geom)
+    else:
+        raise ValueError(
+            f"Unknown weights method: {method!r}. Use 'exact', 'rasterize' or 'numba'."
+        )
 
     cells_intersecting = (weights > 0).sum()
-    print(f"Grid cells intersecting catchment: {cells_intersecting}/{weights.size}")
-    print(f"Total weight (sum of fractions): {weights.sum():.2f} cells equivalent")
+    logger.info("Grid cells intersecting catchment: %d/%d", cells_intersecting, weights.size)
+    logger.info("Total weight (sum of fractions): %.2f cells equivalent", weights.sum())
 
     # Convert to xarray DataArray
     weights_da = xr.DataArray(
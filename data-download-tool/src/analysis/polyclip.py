@@ -0,0 +1,173 @@
+"""
+PHISHES Digital Platform - Polygon Clipping Kernels
+
+Numba kernels computing the fraction of each regular grid cell covered by a polygon.
+Requires the optional ``numba`` dependency (``pip install phishes-data-downloader[numba]``).
+"""
+
+from typing import Iterable, Tuple, Union
+
+import numba
+import numpy as np
+import shapely
+import shapely.geometry
+
+
+@numba.njit(cache=True)
+def _clip_half_plane(xs, ys, n, axis, bound, keep_above):
+    """Clip a ring against one axis-aligned half-plane (one Sutherland-Hodgman pass)."""
+    out_x = np.empty(2 * n, dtype=np.float64)
+    out_y = np.empty(2 * n, dtype=np.float64)
+    m = 0
+    if n == 0:
+        return out_x, out_y, m
+
+    px = xs[n - 1]
+    py = ys[n - 1]
+    pv = px if axis == 0 else py
+    p_in = pv >= bound if keep_above else pv <= bound
+    for k in range(n):
+        cx = xs[k]
+        cy = ys[k]
+        cv = cx if axis == 0 else cy
+        c_in = cv >= bound if keep_above else cv <= bound
+        if c_in != p_in:
+            t = (bound - pv) / (cv - pv)
+            if axis == 0:
+                out_x[m] = bound
+                out_y[m] = py + t * (cy - py)
+            else:
+                out_x[m] = px + t * (cx - px)
+                out_y[m] = bound
+            m += 1
+        if c_in:
+            out_x[m] = cx
+            out_y[m] = cy
+            m += 1
+        px = cx
+        py = cy
+        pv = cv
+        p_in = c_in
+    return out_x, out_y, m
+
+
+@numba.njit(cache=True)
+def _clipped_ring_area(xs, ys, x0, y0, x1, y1):
+    """Unsigned area of a ring clipped to the box ``[x0, x1] x [y0, y1]``."""
+    n = xs.size
+    xs, ys, n = _clip_half_plane(xs, ys, n, 0, x0, True)
+    xs, ys, n = _clip_half_plane(xs, ys, n, 0, x1, False)
+    xs, ys, n = _clip_half_plane(xs, ys, n, 1, y0, True)
+    xs, ys, n = _clip_half_plane(xs, ys, n, 1, y1, False)
+
+    # Shoelace formula
+    area = 0.0
+    for k in range(n):
+        nxt = k + 1 if k + 1 < n else 0
+        area += xs[k] * ys[nxt] - xs[nxt] * ys[k]
+    return abs(area) / 2.0
+
+
+@numba.njit(parallel=True, cache=True)
+def _weights_kernel(lon, lat, lon_res, lat_res, coords, ring_starts, ring_signs, ring_bounds, out):
+    nlon = lon.size
+    cell_area = lon_res * lat_res
+    n_rings = ring_signs.size
+    for cell in numba.prange(lat.size * nlon):
+        i = cell // nlon
+        j = cell % nlon
+        x0 = lon[j] - lon_res / 2
+        x1 = lon[j] + lon_res / 2
+        y0 = lat[i] - lat_res / 2
+        y1 = lat[i] + lat_res / 2
+
+        area = 0.0
+        for r in range(n_rings):
+            if (
+                x1 <= ring_bounds[r, 0]
+                or x0 >= ring_bounds[r, 2]
+                or y1 <= ring_bounds[r, 1]
+                or y0 >= ring_bounds[r, 3]
+            ):
+                continue
+            a = ring_starts[r]
+            b = ring_starts[r + 1]
+            area += ring_signs[r] * _clipped_ring_area(
+                coords[a:b, 0], coords[a:b, 1], x0, y0, x1, y1
+            )
+        out[i, j] = min(max(area / cell_area, 0.0), 1.0)
+
+
+def pack_rings(
+    geom: Union[shapely.geometry.base.BaseGeometry, Iterable[shapely.geometry.base.BaseGeometry]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten polygon rings into one coordinate array with offsets, signs, and bounds.
+
+    ``geom`` is a (multi)polygon or a sequence of them; other geometry types are skipped.
+    Ring ``r`` spans ``coords[ring_starts[r]:ring_starts[r + 1]]``, without its closing
+    vertex. Exteriors have sign 1 and holes -1. Shared by the numba kernels of this
+    module and of ``core.pnpoly``.
+    """
+    rings, signs = [], []
+    for part in shapely.get_parts(np.asarray(geom, dtype=object)):
+        if not isinstance(part, shapely.geometry.Polygon) or part.is_empty:
+            continue
+        rings.append(part.exterior)
+        signs.append(1.0)
+        rings.extend(part.interiors)
+        signs.extend([-1.0] * len(part.interiors))
+
+    # Drop the closing vertex of each ring, the kernel closes rings implicitly
+    ring_coords = [shapely.get_coordinates(ring)[:-1] for ring in rings]
+    ring_starts = np.zeros(len(ring_coords) + 1, dtype=np.int64)
+    ring_starts[1:] = np.cumsum([len(c) for c in ring_coords])
+    coords = np.concatenate(ring_coords) if ring_coords else np.empty((0, 2))
+    ring_bounds = shapely.bounds(np.array(rings, dtype=object)).reshape(-1, 4)
+    return (
+        np.ascontiguousarray(coords, dtype=np.float64),
+        ring_starts,
+        np.array(signs, dtype=np.float64),
+        np.ascontiguousarray(ring_bounds, dtype=np.float64),
+    )
+
+
+def polygon_cell_weights(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    lon_res: float,
+    lat_res: float,
+    geom: shapely.geometry.base.BaseGeometry,
+) -> np.ndarray:
+    """
+    Compute the fraction of each grid cell covered by a (multi)polygon.
+
+    Parameters
+    ----------
+    lon, lat : numpy.ndarray
+        Cell-centre coordinates.
+    lon_res, lat_res : float
+        Cell size along each axis.
+    geom : shapely geometry
+        Polygon or MultiPolygon in the same CRS as the coordinates.
+
+    Returns
+    -------
+    numpy.ndarray
+        float32 array of shape ``(len(lat), len(lon))`` with weights in [0, 1].
+    """
+    coords, ring_starts, ring_signs, ring_bounds = pack_rings(geom)
+    out = np.zeros((lat.size, lon.size), dtype=np.float32)
+    if ring_signs.size:
+        _weights_kernel(
+            np.asarray(lon, dtype=np.float64),
+            np.asarray(lat, dtype=np.float64),
+            float(lon_res),
+            float(lat_res),
+            coords,
+            ring_starts,
+            ring_signs,
+            ring_bounds,
+            out,
+        )
+    return out
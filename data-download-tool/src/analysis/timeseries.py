@@ -6,6 +6,7 @@ Functions for computing basin averages, anomalies, and time series statistics.
 
 from typing import Dict
 
+import numpy as np
 import xarray as xr
 
 
@@ -23,7 +24,8 @@ def compute_basin_average(
     data : xarray.DataArray
         Data array with spatial dimensions (and optionally time).
     weights : xarray.DataArray
-        2D weights array from compute_catchment_weights().
+        2D weights array from compute_catchment_weights(). For Dask-backed data,
+        chunk weights like the spatial dimensions of ``data``.
     lat_dim : str, default "lat"
         Name of latitude dimension.
     lon_dim : str, default "lon"
@@ -34,16 +36,20 @@ def compute_basin_average(
     xarray.DataArray
         Basin-averaged time series (or scalar if no time dimension).
     """
-    if weights.sum() == 0:
+    weights_sum = float(weights.sum())
+    if weights_sum == 0:
         raise ValueError("No grid cells intersect with catchment (all weights are zero)")
 
-    # Compute weighted average: sum(data * weights) / sum(weights)
-    basin_avg = (data * weights).sum(dim=[lat_dim, lon_dim]) / weights.sum()
+    # Compute weighted average: sum(data * weights) / sum(weights) as a single
+    # contraction; missing values contribute nothing, as in a NaN-skipping sum
+    basin_avg = xr.dot(data.fillna(0), weights, dim=[lat_dim, lon_dim]) / weights_sum
+    basin_avg = basin_avg.compute()
 
+    values = basin_avg.values
     print("Basin average computed")
-    print(f"  - Mean: {float(basin_avg.mean()):.4f}")
-    print(f"  - Min: {float(basin_avg.min()):.4f}")
-    print(f"  - Max: {float(basin_avg.max()):.4f}")
+    print(f"  - Mean: {np.nanmean(values):.4f}")
+    print(f"  - Min: {np.nanmin(values):.4f}")
+    print(f"  - Max: {np.nanmax(values):.4f}")
 
     return basin_avg
 
@@ -75,19 +81,22 @@ def compute_anomalies(
     if time_dim not in data.dims:
         raise ValueError(f"Data does not have time dimension '{time_dim}'")
 
+    # Load once so the mean and the statistics below do not each re-read the source
+    data = data.compute()
     temporal_mean = data.mean(dim=time_dim)
     anomalies = data - temporal_mean
 
+    values = anomalies.values
     result = {
         "anomalies": anomalies,
         "mean": float(temporal_mean.values) if temporal_mean.ndim == 0 else temporal_mean,
-        "std": float(anomalies.std().values),
-        "max_positive": float(anomalies.max().values),
-        "max_negative": float(anomalies.min().values),
+        "std": float(np.nanstd(values)),
+        "max_positive": float(np.nanmax(values)),
+        "max_negative": float(np.nanmin(values)),
     }
 
     print("Anomaly Analysis:")
-    print(f"  - Mean anomaly: {float(anomalies.mean()):.4f}")
+    print(f"  - Mean anomaly: {np.nanmean(values):.4f}")
     print(f"  - Std anomaly: {result['std']:.4f}")
     print(f"  - Max positive anomaly: {result['max_positive']:.4f}")
     print(f"  - Max negative anomaly: {result['max_negative']:.4f}")
@@ -4,12 +4,32 @@ PHISHES Digital Platform - Visualization Functions
 Functions for plotting spatial data, time series, and catchments.
 """
 
-from typing import Optional, Tuple
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import geopandas as gpd
+import pyproj
 import xarray as xr
 
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# Parsed once; comparing CRS objects avoids re-parsing an "EPSG:4326" string per call
+_WGS84 = pyproj.CRS.from_epsg(4326)
+
+_plt = None
+
+
+def _get_plt():
+    """Import ``matplotlib.pyplot`` on first use rather than at module import."""
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+
+        _plt = plt
+    return _plt
+
 
 def plot_catchment(
     catchment: gpd.GeoDataFrame,
@@ -45,6 +65,7 @@ def plot_catchment(
     tuple
         (Figure, Axes)
     """
+    plt = _get_plt()
     if ax is None:
         fig, ax = plt.subplots(figsize=figsize)
     else:
@@ -52,8 +73,9 @@ def plot_catchment(
 
     catchment.plot(ax=ax, facecolor=facecolor, edgecolor=edgecolor, linewidth=linewidth)
     ax.set_title(title, fontsize=14, fontweight="bold")
-    ax.set_xlabel("Longitude" if catchment.crs.is_geographic else "X [m]")
-    ax.set_ylabel("Latitude" if catchment.crs.is_geographic else "Y [m]")
+    is_geo = catchment.crs.is_geographic if catchment.crs else False
+    ax.set_xlabel("Longitude" if is_geo else "X [m]")
+    ax.set_ylabel("Latitude" if is_geo else "Y [m]")
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
 
@@ -97,6 +119,7 @@ def plot_spatial_map(
     tuple
         (Figure, Axes)
     """
+    plt = _get_plt()
     if ax is None:
         fig, ax = plt.subplots(figsize=figsize)
     else:
@@ -107,7 +130,7 @@ def plot_spatial_map(
 
     # Overlay catchment
     if catchment is not None:
-        if catchment.crs != "EPSG:4326":
+        if catchment.crs != _WGS84:
             catchment_plot = catchment.to_crs("EPSG:4326")
         else:
             catchment_plot = catchment
@@ -162,6 +185,7 @@ def plot_time_series(
     tuple
         (Figure, Axes)
     """
+    plt = _get_plt()
     if ax is None:
         fig, ax = plt.subplots(figsize=figsize)
     else:
@@ -4,11 +4,19 @@ PHISHES Digital Platform - Core Module
 This package contains the core functionality for the PDP system.
 """
 
-from .utils import build_dataset_path, open_dataset_any, cleanup_existing_dataset
+from .utils import (
+    build_dataset_path,
+    cleanup_existing_dataset,
+    get_dataset_encoding,
+    get_write_chunks,
+    open_dataset_any,
+)
 from .folder_structure import create_pdp_folders, PDPFolderStructure
 
 __all__ = [
     "build_dataset_path",
+    "get_dataset_encoding",
+    "get_write_chunks",
     "open_dataset_any",
     "cleanup_existing_dataset",
     "create_pdp_folders",
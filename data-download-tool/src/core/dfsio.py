@@ -8,7 +8,7 @@ Date: January 2026
 """
 
 from pathlib import Path
-from typing import Union, Optional
+from typing import Union, Optional, Tuple
 
 import mikeio
 from mikeio.eum import EUMType, EUMUnit
@@ -19,6 +19,17 @@ import numpy as np
 from .utils import get_grid_resolution, guess_data_variable
 
 
+def _axis_bounds(values: np.ndarray) -> Tuple[float, float]:
+    """
+    Return (min, max) of a grid axis from its end points.
+
+    Grid2D axes are monotonic, so the extremes are the first and last values and the
+    full coordinate vector does not need to be scanned.
+    """
+    first, last = values[0], values[-1]
+    return (first, last) if first <= last else (last, first)
+
+
 def dfs_from_xr(
     da: Union[xr.DataArray, xr.Dataset],
     varname: str,
@@ -53,23 +64,23 @@ def dfs_from_xr(
     if isinstance(da, xr.Dataset):
         da = da[guess_data_variable(da)]
 
-    if 1 in [np.ma.count(da["lon"].values), np.ma.count(da["lat"].values)]:
-        dx = res or get_grid_resolution(da["lon"], default=0.1)
-        dy = res or get_grid_resolution(da["lat"], default=0.1)
-        bbox = (
-            np.min(da["lon"].values) - dx / 2,
-            np.min(da["lat"].values) - dy / 2,
-            np.max(da["lon"].values),
-            np.max(da["lat"].values),
-        )
+    lon_v = da["lon"].values
+    lat_v = da["lat"].values
+
+    if lon_v.size == 1 or lat_v.size == 1:
+        dx = res or get_grid_resolution(lon_v, default=0.1)
+        dy = res or get_grid_resolution(lat_v, default=0.1)
+        lon_min, lon_max = _axis_bounds(lon_v)
+        lat_min, lat_max = _axis_bounds(lat_v)
+        bbox = (lon_min - dx / 2, lat_min - dy / 2, lon_max, lat_max)
     else:
         bbox = None
         dx = None
         dy = None
 
     geom = mikeio.spatial.Grid2D(
-        x=da["lon"].values,
-        y=da["lat"].values,
+        x=lon_v,
+        y=lat_v,
         projection="LONG/LAT",
         dx=dx,
         dy=dy,
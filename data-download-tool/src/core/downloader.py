@@ -10,21 +10,85 @@ Date: January 2026
 
 """
 
+import collections
+import copy
+import functools
 import json
+import os
+import threading
 import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple, Union
 from datetime import datetime
 
 import adlfs
+import dask
 import geopandas as gpd
-import rioxarray  # noqa: F401 - enables .rio accessor on xarray objects
+import numpy as np
+import pandas as pd
+from fsspec.implementations.cached import SimpleCacheFileSystem
 import xarray as xr
-
-from .utils import build_dataset_path, get_grid_resolution, remove_path_with_retry
+from affine import Affine
+from rasterio.features import geometry_mask
+from xarray.coding.times import encode_cf_datetime
+
+from .utils import (
+    build_dataset_path,
+    get_dataset_encoding,
+    get_grid_resolution,
+    get_write_chunks,
+    get_transformer,
+    remove_path_with_retry,
+)
 from ..analysis import load_catchment, validate_catchment_gdf, reproject_catchment
 from . import dfsio
 
+# libyaml's loader is several times faster when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_catalog(path: str, mtime_ns: int) -> Dict:
+    """Parse a catalog file; cached per path and modification time."""
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+@functools.lru_cache(maxsize=None)
+def _prefetched_store_class():
+    """Build (once) a zarr 3 store wrapper answering ``.zmetadata`` from memory."""
+    from zarr.storage import WrapperStore
+
+    class PrefetchedMetadataStore(WrapperStore):
+        def __init__(self, store, zmetadata: bytes):
+            super().__init__(store)
+            self._zmetadata = zmetadata
+
+        async def get(self, key, prototype, byte_range=None):
+            if key == ".zmetadata" and byte_range is None:
+                return prototype.buffer.from_bytes(self._zmetadata)
+            return await super().get(key, prototype, byte_range)
+
+    return PrefetchedMetadataStore
+
+
+def _with_prefetched_metadata(store, zmetadata: bytes):
+    """
+    Wrap an fsspec mapper so reads of ``.zmetadata`` are served from prefetched bytes.
+
+    All other keys are read from ``store``.
+    """
+    import zarr
+
+    if int(zarr.__version__.split(".")[0]) < 3:
+        # zarr 2 accepts any mapping; lookups hit the in-memory overlay first
+        return collections.ChainMap({".zmetadata": zmetadata}, store)
+
+    from zarr.storage import FsspecStore
+
+    return _prefetched_store_class()(FsspecStore.from_mapper(store, read_only=True), zmetadata)
+
 
 class PDPDataDownloader:
     """
@@ -52,6 +116,14 @@ class PDPDataDownloader:
     SUPPORTED_OUTPUT_FORMATS = {"nc", "zarr", "dfs2"}
     CATALOG_FILE = Path(__file__).parent.joinpath("dataset_catalog.yaml")
 
+    # Threads used to fetch, decompress, compress and write chunks in save_dataset
+    WRITE_WORKERS = os.cpu_count() or 8
+
+    # Recognized dimension names, in order of preference
+    X_DIMS = ("x", "lon", "longitude")
+    Y_DIMS = ("y", "lat", "latitude")
+    TIME_DIMS = ("time", "date", "t")
+
     def __init__(
         self,
         catchment: Union[str, Path, gpd.GeoDataFrame],
@@ -62,6 +134,10 @@ class PDPDataDownloader:
         buffer_cells: int = 1,
         output_format: Optional[str] = None,
         mask_on_catchment: bool = False,
+        validate_connection: bool = False,
+        use_numba: bool = False,
+        compression_level: int = 0,
+        use_local_cache: bool = False,
     ):
         """
         Initialize the data downloader.
@@ -83,6 +159,22 @@ class PDPDataDownloader:
             Buffer around catchment in number of grid cells.
         output_format : str, optional
             Output format for downloaded datasets. Supported: "nc", "zarr", "dfs2".
+        mask_on_catchment : bool, default False
+            Clip datasets to the catchment boundary instead of its bounding box.
+        validate_connection : bool, default False
+            Check that the Azure container exists when connecting. Otherwise connection
+            errors surface on the first dataset access.
+        use_numba : bool, default False
+            With ``mask_on_catchment``, mask with the numba point-in-polygon kernel
+            (cells whose centre is inside the catchment) instead of rasterio (all
+            touched cells). Faster on dense grids; requires the ``numba`` extra.
+        compression_level : int, default 0
+            zlib compression level (1-9) for NetCDF output. 0 writes uncompressed,
+            which is several times faster to write.
+        use_local_cache : bool, default False
+            Cache remote chunks on local disk under ``<output_base>/_cache`` so repeated
+            reads are served locally. The cache is removed by :meth:`clear_cache`, which
+            :meth:`download_all` calls when it finishes.
         """
         self.output_base = Path(output_base)
         self.azure_account = azure_account or self.DEFAULT_AZURE_ACCOUNT
@@ -91,10 +183,19 @@ class PDPDataDownloader:
         self.buffer_cells = int(buffer_cells)
         self.output_format = (output_format or self.DEFAULT_OUTPUT_FORMAT).lower()
         self.mask_on_catchment = bool(mask_on_catchment)
+        self.validate_connection = bool(validate_connection)
+        self.use_numba = bool(use_numba)
+        self.compression_level = int(compression_level)
+        self.use_local_cache = bool(use_local_cache)
+        self.cache_dir = self.output_base.joinpath("_cache")
+        self._cache_fs = None
 
         if self.buffer_cells < 0:
             raise ValueError("buffer_cells must be a non-negative integer")
 
+        if not 0 <= self.compression_level <= 9:
+            raise ValueError("compression_level must be between 0 and 9")
+
         if self.output_format not in self.SUPPORTED_OUTPUT_FORMATS:
             raise ValueError(
                 f"Unsupported output_format: {self.output_format}. "
@@ -112,12 +213,25 @@ class PDPDataDownloader:
             self.catchment_shp = Path(catchment)
             self.catchment = self._load_catchment()
 
+        # Catchment reprojected per dataset CRS, see _get_catchment_reproj
+        self._reproj_cache = {}
+        # Grid resolution per (dataset path, dimension), see _grid_resolution
+        self._res_cache: Dict[Tuple[str, str], Optional[float]] = {}
+        # (x, y, time) dimension names per dataset path, see _detect_dims
+        self._dims_cache: Dict[str, Tuple[Optional[str], ...]] = {}
+        # Consolidated metadata per remote store (None if absent), see _prefetch_metadata
+        self._zmetadata: Dict[str, Optional[bytes]] = {}
+
         # Setup Azure connection
         self.fs = self._setup_azure_connection(azure_credential)
 
         # Create log file
-        self.log_file = self.output_base.joinpath("logs", "download_log.json")
+        self.log_file = self.output_base.joinpath("logs", "download_log.jsonl")
         self.download_history = self._load_download_history()
+        self._history_lock = threading.Lock()
+        # Write pool shared by all saves, so concurrent downloads (download_all) never
+        # run more than WRITE_WORKERS write threads in total; threads start on demand
+        self._write_pool = ThreadPoolExecutor(max_workers=self.WRITE_WORKERS)
 
     def set_output_format(self, output_format: Optional[str] = None):
         """Set the output format for downloaded datasets."""
@@ -137,8 +251,9 @@ class PDPDataDownloader:
         """Load dataset catalog from YAML file."""
         if not self.CATALOG_FILE.exists():
             raise FileNotFoundError(f"Dataset catalog not found: {self.CATALOG_FILE}")
-        with open(self.CATALOG_FILE, "r") as f:
-            return yaml.safe_load(f)
+        # Parsed once per file version; each instance gets its own copy to modify
+        catalog = _read_catalog(str(self.CATALOG_FILE), self.CATALOG_FILE.stat().st_mtime_ns)
+        return copy.deepcopy(catalog)
 
     def _setup_azure_connection(self, credential: Optional[str] = None):
         """
@@ -170,13 +285,15 @@ class PDPDataDownloader:
                 print("WARNING: No credential provided, attempting anonymous access")
                 fs = adlfs.AzureBlobFileSystem(account_name=self.azure_account, anon=True)
 
-            # Test connection
-            try:
-                fs.ls(self.azure_container)
-                print("Successfully connected to Azure storage")
-            except Exception as e:
-                print(f"ERROR: Connection test failed: {e}")
-                raise
+            # Test connection with a single request on the container, not a blob listing
+            if self.validate_connection:
+                try:
+                    if not fs.exists(self.azure_container):
+                        raise ConnectionError(f"Container not found: {self.azure_container}")
+                    print("Successfully connected to Azure storage")
+                except Exception as e:
+                    print(f"ERROR: Connection test failed: {e}")
+                    raise
 
             return fs
 
@@ -210,17 +327,72 @@ class PDPDataDownloader:
         return gdf
 
     def _load_download_history(self) -> Dict:
-        """Load download history from JSON log file."""
+        """
+        Load download history from the JSON Lines log file.
+
+        Entries from a legacy ``download_log.json`` next to it are read first.
+        """
+        downloads = []
+        legacy_file = self.log_file.with_suffix(".json")
+        if legacy_file.exists():
+            with open(legacy_file, "r") as f:
+                downloads.extend(json.load(f).get("downloads", []))
         if self.log_file.exists():
             with open(self.log_file, "r") as f:
-                return json.load(f)
-        return {"downloads": []}
+                downloads.extend(json.loads(line) for line in f if line.strip())
+        return {"downloads": downloads}
 
-    def _save_download_history(self):
-        """Save download history to JSON log file."""
+    def _append_download_history(self, log_entry: Dict):
+        """Append a single entry to the JSON Lines log file."""
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.log_file, "w") as f:
-            json.dump(self.download_history, f, indent=2)
+        with open(self.log_file, "a") as f:
+            f.write(json.dumps(log_entry) + "\n")
+
+    def _get_catchment_reproj(self, crs: str) -> Tuple[gpd.GeoDataFrame, np.ndarray]:
+        """
+        Get the catchment reprojected to a dataset CRS, cached per CRS.
+
+        Parameters
+        ----------
+        crs : str
+            Target CRS (e.g., 'EPSG:4326').
+
+        Returns
+        -------
+        tuple
+            (reprojected catchment, its total bounds (minx, miny, maxx, maxy))
+        """
+        key = str(crs)
+        cached = self._reproj_cache.get(key)
+        if cached is None:
+            catchment_reproj = reproject_catchment(self.catchment, crs)
+            cached = (catchment_reproj, catchment_reproj.total_bounds)
+            self._reproj_cache[key] = cached
+        return cached
+
+    def _get_catchment_bounds(self, crs: str) -> Tuple[float, float, float, float]:
+        """
+        Get the catchment bounding box in a dataset CRS.
+
+        Only the source bounding box is transformed, densified along its edges so curved
+        edges in the target CRS are covered, instead of every catchment vertex. Reuses
+        the reprojected catchment bounds when already cached.
+
+        Parameters
+        ----------
+        crs : str
+            Target CRS (e.g., 'EPSG:4326').
+
+        Returns
+        -------
+        tuple
+            (minx, miny, maxx, maxy)
+        """
+        cached = self._reproj_cache.get(str(crs))
+        if cached is not None:
+            return tuple(cached[1])
+        transformer = get_transformer(self.catchment.crs, crs)
+        return transformer.transform_bounds(*self.catchment.total_bounds, densify_pts=21)
 
     def list_available_datasets(self) -> Dict:
         """
@@ -254,7 +426,7 @@ class PDPDataDownloader:
         except KeyError:
             raise ValueError(f"Dataset not found: {category}/{subcategory}")
 
-    def open_dataset(self, category: str, subcategory: str) -> xr.Dataset:
+    def open_dataset(self, category: str, subcategory: str, decode_cf: bool = True) -> xr.Dataset:
         """
         Open a remote dataset from Azure Blob Storage.
 
@@ -264,6 +436,10 @@ class PDPDataDownloader:
             Dataset category (e.g., 'climate').
         subcategory : str
             Dataset subcategory (e.g., 'temperature').
+        decode_cf : bool, default True
+            Decode CF conventions (times, scale/offset, fill values) on open. With False,
+            :meth:`process_dataset` decodes after subsetting, so the full time axis is
+            never decoded.
 
         Returns
         -------
@@ -276,17 +452,80 @@ class PDPDataDownloader:
         print(f"Opening remote dataset: {category} --> {subcategory}")
 
         try:
-            store = self.fs.get_mapper(azure_path)
-            try:
-                ds = xr.open_zarr(store, consolidated=True)
-            except Exception:
-                ds = xr.open_zarr(store, consolidated=False)
+            store = self._get_store(azure_path)
+            zmetadata = self._zmetadata.get(azure_path, b"")
+            if zmetadata is None:
+                # Known to have no consolidated metadata, skip the failing attempt
+                ds = xr.open_zarr(store, consolidated=False, decode_cf=decode_cf)
+            elif zmetadata:
+                # Serve the prefetched metadata instead of fetching it again
+                store = _with_prefetched_metadata(store, zmetadata)
+                ds = xr.open_zarr(store, consolidated=True, decode_cf=decode_cf)
+            else:
+                try:
+                    ds = xr.open_zarr(store, consolidated=True, decode_cf=decode_cf)
+                except Exception:
+                    ds = xr.open_zarr(store, consolidated=False, decode_cf=decode_cf)
         except Exception as e:
             print(f"ERROR: Failed to open dataset: {e}")
             raise
 
         return ds
 
+    def _prefetch_metadata(self, datasets: List[Tuple[str, str]]):
+        """
+        Fetch the consolidated metadata of several datasets in one batched request.
+
+        The filesystem issues the reads concurrently. :meth:`open_dataset` then reads
+        the metadata from memory, and opens stores known to have none (neither a
+        ``.zmetadata`` nor a Zarr v3 ``zarr.json``) non-consolidated directly. Stores
+        whose reads failed for another reason (timeouts, auth, throttling) are left to
+        the usual consolidated/fallback logic.
+
+        Parameters
+        ----------
+        datasets : list of tuple
+            (category, subcategory) pairs from the catalog.
+        """
+        azure_paths = []
+        for category, subcategory in datasets:
+            path = self.dataset_catalog[category][subcategory].get("path")
+            if path:
+                azure_paths.append(f"{self.azure_container}/{path}")
+        if not azure_paths:
+            return
+
+        keys = [f"{p}/{name}" for p in azure_paths for name in (".zmetadata", "zarr.json")]
+        try:
+            results = self.fs.cat(keys, on_error="return")
+        except Exception as e:
+            print(f"WARNING: Could not prefetch dataset metadata: {e}")
+            return
+
+        for azure_path in azure_paths:
+            zmetadata = results.get(f"{azure_path}/.zmetadata")
+            zarr_json = results.get(f"{azure_path}/zarr.json")
+            if isinstance(zmetadata, bytes):
+                self._zmetadata[azure_path] = zmetadata
+            elif isinstance(zmetadata, FileNotFoundError) and isinstance(
+                zarr_json, FileNotFoundError
+            ):
+                self._zmetadata[azure_path] = None
+
+    def _get_store(self, azure_path: str):
+        """Get a key-value store for a remote path, through the local cache if enabled."""
+        if not self.use_local_cache:
+            return self.fs.get_mapper(azure_path)
+        if self._cache_fs is None:
+            self._cache_fs = SimpleCacheFileSystem(fs=self.fs, cache_storage=str(self.cache_dir))
+        return self._cache_fs.get_mapper(azure_path)
+
+    def clear_cache(self):
+        """Remove the local chunk cache used with ``use_local_cache``."""
+        self._cache_fs = None
+        if self.cache_dir.exists():
+            remove_path_with_retry(self.cache_dir)
+
     def process_dataset(
         self,
         ds: xr.Dataset,
@@ -298,6 +537,8 @@ class PDPDataDownloader:
         """
         Apply spatial subsetting, temporal subsetting, and variable selection.
 
+        Datasets opened with ``decode_cf=False`` are CF-decoded after subsetting.
+
         Parameters
         ----------
         ds : xarray.Dataset
@@ -318,23 +559,39 @@ class PDPDataDownloader:
         """
         dataset_info = self.get_dataset_info(category, subcategory)
 
-        # Get catchment in dataset CRS
-        catchment_reproj = reproject_catchment(self.catchment, dataset_info["crs"])
-        bounds = catchment_reproj.total_bounds  # (minx, miny, maxx, maxy)
+        # Get catchment bounds in dataset CRS; the geometry itself is only needed to mask
+        if self.mask_on_catchment:
+            catchment_reproj, bounds = self._get_catchment_reproj(dataset_info["crs"])
+        else:
+            catchment_reproj = None
+            bounds = self._get_catchment_bounds(dataset_info["crs"])
 
         # Spatial subsetting
-        ds = self._spatial_subset(ds, bounds, catchment_reproj, dataset_info["crs"])
+        ds = self._spatial_subset(ds, bounds, catchment_reproj, cache_key=dataset_info["path"])
 
         # Temporal subsetting
         if time_range and dataset_info["temporal"]:
-            ds = self._temporal_subset(ds, time_range)
+            ds = self._temporal_subset(ds, time_range, cache_key=dataset_info["path"])
 
         # Variable selection
         if variables:
             ds = ds[variables]
 
+        if self._is_cf_encoded(ds):
+            ds = xr.decode_cf(ds)
+
         return ds
 
+    @staticmethod
+    def _is_cf_encoded(ds: xr.Dataset) -> bool:
+        """Check whether a dataset was opened without decoding CF conventions."""
+        for var in ds.variables.values():
+            if {"scale_factor", "add_offset", "_FillValue"} & var.attrs.keys():
+                return True
+            if " since " in str(var.attrs.get("units", "")):
+                return True
+        return False
+
     def save_dataset(
         self,
         ds: xr.Dataset,
@@ -367,15 +624,36 @@ class PDPDataDownloader:
             self.output_base, category, subcategory, self.output_format
         )
 
-        # Remove existing if present
-        remove_path_with_retry(output_path)
+        # Remove existing if present; afterwards the path is free, so the zarr writer
+        # is opened with mode "w-" and has no existing store to clear
+        if output_path.exists():
+            remove_path_with_retry(output_path)
 
         print(f"Writing output to: {output_path}")
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Write to disk
+        # Write to disk; lazy (dask) datasets are written from a delayed graph so Azure
+        # reads, decompression and local writes overlap on the shared write pool
+        # Detected without the per-path cache, the spatial dims were renamed to lat/lon
+        _, _, time_dim = self._detect_dims(ds)
+        encoding = get_dataset_encoding(
+            ds, self.output_format, compression_level=self.compression_level, time_dim=time_dim
+        )
         if self.output_format == "zarr":
-            ds.to_zarr(output_path, mode="w", consolidated=True, zarr_format=2, safe_chunks=False)
+            if ds.chunks:
+                # Output chunks follow the dask chunks; make them large enough (>= 1 MiB)
+                # that compressing and writing them is not dominated by per-chunk overhead
+                ds = ds.chunk(get_write_chunks(ds, time_dim=time_dim))
+            delayed = ds.to_zarr(
+                output_path,
+                mode="w-",
+                consolidated=True,
+                zarr_format=2,
+                safe_chunks=False,
+                encoding=encoding,
+                compute=False,
+            )
+            dask.compute(delayed, scheduler="threads", pool=self._write_pool)
         elif self.output_format == "dfs2":
             dfsio.create_file(
                 ds,
@@ -385,11 +663,26 @@ class PDPDataDownloader:
                 eumunit=dataset_info.get("eumunit"),
             )
         else:
-            ds.to_netcdf(output_path, mode="w", engine="netcdf4")
+            if ds.chunks:
+                # Coalesce spatial chunks so each write covers whole 2D slices, and
+                # align time chunks with the file chunks so a write spans many steps
+                spatial_dims = set(self.X_DIMS + self.Y_DIMS)
+                chunks = {dim: -1 for dim in spatial_dims.intersection(ds.dims)}
+                time_chunks = [
+                    enc["chunksizes"][ds[name].dims.index(time_dim)]
+                    for name, enc in encoding.items()
+                    if time_dim in ds[name].dims
+                ]
+                if time_chunks:
+                    chunks[time_dim] = min(time_chunks)
+                ds = ds.chunk(chunks)
+            delayed = ds.to_netcdf(
+                output_path, mode="w", engine="h5netcdf", encoding=encoding, compute=False
+            )
+            dask.compute(delayed, scheduler="threads", pool=self._write_pool)
 
         # Log download
-        catchment_reproj = reproject_catchment(self.catchment, dataset_info["crs"])
-        bounds = catchment_reproj.total_bounds
+        bounds = self._get_catchment_bounds(dataset_info["crs"])
         self._log_download(category, subcategory, dataset_info, output_path, bounds, time_range)
 
         print(f"Download complete: {output_path.relative_to(self.output_base)}")
@@ -427,7 +720,7 @@ class PDPDataDownloader:
         print(f"Starting download: {category} --> {subcategory}")
         print("This may take a few minutes depending on the data size and your connection.")
 
-        ds = self.open_dataset(category, subcategory)
+        ds = self.open_dataset(category, subcategory, decode_cf=False)
         ds = self.process_dataset(ds, category, subcategory, time_range, variables)
         return self.save_dataset(ds, category, subcategory, time_range)
 
@@ -435,8 +728,8 @@ class PDPDataDownloader:
         self,
         ds: xr.Dataset,
         bounds: Tuple[float, float, float, float],
-        catchment_reproj: gpd.GeoDataFrame,
-        dataset_crs: str,
+        catchment_reproj: Optional[gpd.GeoDataFrame],
+        cache_key: Optional[str] = None,
     ) -> xr.Dataset:
         """
         Subset dataset by spatial bounds.
@@ -447,6 +740,10 @@ class PDPDataDownloader:
             Input dataset.
         bounds : tuple
             Bounding box (minx, miny, maxx, maxy).
+        catchment_reproj : GeoDataFrame, optional
+            Catchment in the dataset CRS; required with ``mask_on_catchment``.
+        cache_key : str, optional
+            Dataset path used to cache grid resolutions across calls.
 
         Returns
         -------
@@ -456,18 +753,7 @@ class PDPDataDownloader:
         minx, miny, maxx, maxy = bounds
 
         # Identify spatial dimensions (common names)
-        x_dim = None
-        y_dim = None
-
-        for dim in ["x", "lon", "longitude"]:
-            if dim in ds.dims:
-                x_dim = dim
-                break
-
-        for dim in ["y", "lat", "latitude"]:
-            if dim in ds.dims:
-                y_dim = dim
-                break
+        x_dim, y_dim, _ = self._detect_dims(ds, cache_key)
 
         if not (x_dim and y_dim):
             print("WARNING: Could not identify spatial dimensions, returning full dataset")
@@ -475,27 +761,38 @@ class PDPDataDownloader:
 
         # Expand bounds by a number of grid cells (buffer_cells)
         if self.mask_on_catchment:
-            # Standardize dimension names for rioxarray compatibility
+            # Cut the bounding-box window first (padded by at least one cell), so the
+            # mask only rasterizes and fetches that window instead of the full grid
+            pad = max(self.buffer_cells, 1)
+            x_pad = pad * self._grid_resolution(ds[x_dim], cache_key, default=0.0)
+            y_pad = pad * self._grid_resolution(ds[y_dim], cache_key, default=0.0)
+            x_slice = self._compute_bbox_slice(ds[x_dim].values, minx - x_pad, maxx + x_pad)
+            y_slice = self._compute_bbox_slice(ds[y_dim].values, miny - y_pad, maxy + y_pad)
+            if x_slice.stop > x_slice.start and y_slice.stop > y_slice.start:
+                ds = ds.isel({x_dim: x_slice, y_dim: y_slice})
+
             print("Clipping dataset to catchment boundary")
-            ds = ds.rename({y_dim: "y", x_dim: "x"})
 
-            # Keep only variables with spatial dimensions
-            spatial_vars = [v for v in ds.data_vars if {"y", "x"}.issubset(ds[v].dims)]
-            ds = ds[spatial_vars]
+            # Keep only variables with spatial dimensions, and only dimension coordinates
+            # (auxiliary coordinates such as spatial_ref or bounds are not masked)
+            attrs = dict(ds.attrs)
+            spatial_vars = [v for v in ds.data_vars if {y_dim, x_dim}.issubset(ds[v].dims)]
+            ds = ds[spatial_vars].reset_coords(drop=True)
 
-            # Clip to catchment boundary
-            ds.rio.write_crs(dataset_crs, inplace=True)
-            ds = ds.rio.clip(catchment_reproj.geometry, catchment_reproj.crs, all_touched=True)
+            # Mask to catchment boundary
+            ds = self._mask_to_catchment(
+                ds, catchment_reproj, x_dim, y_dim, use_numba=self.use_numba
+            )
 
-            # Clean up and restore standard coordinate names
-            ds = ds.drop_vars("spatial_ref", errors="ignore").rename({"y": "lat", "x": "lon"})
+            # Restore attributes and standard coordinate names
+            ds = ds.assign_attrs(attrs).rename({y_dim: "lat", x_dim: "lon"})
 
         elif self.buffer_cells > 0:
             x_coord = ds[x_dim]
             y_coord = ds[y_dim]
 
-            x_spacing = get_grid_resolution(x_coord, default=0.0)
-            y_spacing = get_grid_resolution(y_coord, default=0.0)
+            x_spacing = self._grid_resolution(x_coord, cache_key, default=0.0)
+            y_spacing = self._grid_resolution(y_coord, cache_key, default=0.0)
 
             if x_spacing > 0 and y_spacing > 0:
                 minx -= self.buffer_cells * x_spacing
@@ -504,9 +801,11 @@ class PDPDataDownloader:
                 maxy += self.buffer_cells * y_spacing
                 print(f"Applied {self.buffer_cells} cell buffer to bounds")
 
-        # Use slice-based selection with nearest neighbor interpolation
+        # Use positional slices from the coordinate values, with nearest neighbor fallback
         try:
-            ds_subset = ds.sel({x_dim: slice(minx, maxx), y_dim: slice(miny, maxy)})
+            x_slice = self._compute_bbox_slice(ds[x_dim].values, minx, maxx)
+            y_slice = self._compute_bbox_slice(ds[y_dim].values, miny, maxy)
+            ds_subset = ds.isel({x_dim: x_slice, y_dim: y_slice})
 
             # If we got empty dimensions, fall back to nearest neighbor
             if ds_subset.sizes.get(x_dim, 0) == 0 or ds_subset.sizes.get(y_dim, 0) == 0:
@@ -518,8 +817,8 @@ class PDPDataDownloader:
                 x_coord = ds[x_dim]
                 y_coord = ds[y_dim]
 
-                x_spacing = get_grid_resolution(x_coord, default=0.25)
-                y_spacing = get_grid_resolution(y_coord, default=0.25)
+                x_spacing = self._grid_resolution(x_coord, cache_key, default=0.25)
+                y_spacing = self._grid_resolution(y_coord, cache_key, default=0.25)
 
                 grid_size = max(2 * self.buffer_cells + 1, 1)
                 x_expand = (grid_size * x_spacing) / 2
@@ -532,18 +831,17 @@ class PDPDataDownloader:
 
                 print(f"Using {grid_size}x{grid_size} grid centered on catchment")
 
-                x_mask = (x_coord >= minx_nn) & (x_coord <= maxx_nn)
-                y_mask = (y_coord >= miny_nn) & (y_coord <= maxy_nn)
-
-                x_in_range = x_coord[x_mask]
-                y_in_range = y_coord[y_mask]
+                x_slice = self._compute_bbox_slice(x_coord.values, minx_nn, maxx_nn)
+                y_slice = self._compute_bbox_slice(y_coord.values, miny_nn, maxy_nn)
+                nx = x_slice.stop - x_slice.start
+                ny = y_slice.stop - y_slice.start
 
-                if len(x_in_range) == 0 or len(y_in_range) == 0:
+                if nx == 0 or ny == 0:
                     print("WARNING: Could not find any coordinates, returning full dataset")
                     return ds
 
-                ds_subset = ds.sel({x_dim: x_in_range, y_dim: y_in_range})
-                print(f"Found {len(x_in_range)} x {len(y_in_range)} coordinates in range")
+                ds_subset = ds.isel({x_dim: x_slice, y_dim: y_slice})
+                print(f"Found {nx} x {ny} coordinates in range")
 
         except Exception as e:
             print(f"ERROR: Selection failed: {e}, returning full dataset")
@@ -552,7 +850,119 @@ class PDPDataDownloader:
         print(f"Subset shape: {dict(ds_subset.sizes)}")
         return ds_subset
 
-    def _temporal_subset(self, ds: xr.Dataset, time_range: Tuple[str, str]) -> xr.Dataset:
+    @staticmethod
+    def _mask_to_catchment(
+        ds: xr.Dataset,
+        catchment_reproj: gpd.GeoDataFrame,
+        x_dim: str,
+        y_dim: str,
+        use_numba: bool = False,
+    ) -> xr.Dataset:
+        """
+        Mask cells outside the catchment and crop to the cells it touches.
+
+        The catchment is rasterized once onto the dataset grid (all touched cells count
+        as inside), or with ``use_numba`` tested against the cell centres. Cells outside
+        are set to the variable's ``_FillValue`` when the dataset is not CF-decoded yet,
+        NaN otherwise.
+        """
+        xv = ds[x_dim].values
+        yv = ds[y_dim].values
+        if xv.size < 2 or yv.size < 2:
+            return ds
+
+        if use_numba:
+            try:
+                from .pnpoly import grid_mask
+            except ImportError:
+                print("WARNING: numba is not installed, masking with rasterio instead")
+                use_numba = False
+
+        if use_numba:
+            inside = grid_mask(catchment_reproj.geometry, xv, yv)
+        else:
+            # Signed steps so the raster rows/columns follow the coordinate order
+            dx = float(xv[1] - xv[0])
+            dy = float(yv[1] - yv[0])
+            transform = Affine(dx, 0.0, xv[0] - dx / 2, 0.0, dy, yv[0] - dy / 2)
+            inside = ~geometry_mask(
+                catchment_reproj.geometry,
+                out_shape=(yv.size, xv.size),
+                transform=transform,
+                all_touched=True,
+            )
+
+        rows = np.flatnonzero(inside.any(axis=1))
+        cols = np.flatnonzero(inside.any(axis=0))
+        if rows.size == 0:
+            print("WARNING: Catchment does not touch any grid cell, skipping mask")
+            return ds
+
+        rows = slice(rows[0], rows[-1] + 1)
+        cols = slice(cols[0], cols[-1] + 1)
+        ds = ds.isel({y_dim: rows, x_dim: cols})
+        inside = xr.DataArray(inside[rows, cols], dims=(y_dim, x_dim))
+
+        for name in ds.data_vars:
+            ds[name] = ds[name].where(inside, ds[name].attrs.get("_FillValue", np.nan))
+        return ds
+
+    def _grid_resolution(
+        self, coord: xr.DataArray, cache_key: Optional[str], default: float
+    ) -> float:
+        """Grid resolution of a coordinate, cached per (dataset path, dimension)."""
+        if cache_key is None:
+            return get_grid_resolution(coord, default=default)
+        key = (cache_key, coord.name)
+        if key not in self._res_cache:
+            self._res_cache[key] = get_grid_resolution(coord, default=None)
+        res = self._res_cache[key]
+        return default if res is None else res
+
+    @staticmethod
+    def _compute_bbox_slice(values: np.ndarray, lo: float, hi: float) -> slice:
+        """
+        Positional slice of a sorted 1D coordinate covering ``[lo, hi]``.
+
+        Uses binary search, so no boolean mask is built over the coordinate. Both
+        ascending and descending coordinates (e.g., north-to-south latitude) are handled.
+        """
+        if values.size > 1 and values[0] > values[-1]:
+            rev = values[::-1]
+            start = values.size - int(np.searchsorted(rev, hi, side="right"))
+            stop = values.size - int(np.searchsorted(rev, lo, side="left"))
+            return slice(start, stop)
+        return slice(
+            int(np.searchsorted(values, lo, side="left")),
+            int(np.searchsorted(values, hi, side="right")),
+        )
+
+    def _detect_dims(
+        self, ds: xr.Dataset, cache_key: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Identify the x, y, and time dimension names of a dataset.
+
+        Each is the preferred name from X_DIMS, Y_DIMS, or TIME_DIMS present in the
+        dataset, or None. Results are cached per ``cache_key`` (dataset path) and reused
+        while those dimensions are still present.
+        """
+        cached = self._dims_cache.get(cache_key) if cache_key else None
+        if cached is not None and all(dim is None or dim in ds.dims for dim in cached):
+            return cached
+
+        dims = set(ds.dims)
+        found = tuple(
+            min(dims.intersection(names), key=names.index, default=None)
+            for names in (self.X_DIMS, self.Y_DIMS, self.TIME_DIMS)
+        )
+        if cache_key:
+            self._dims_cache[cache_key] = found
+        return found
+
+    def _temporal_subset(
+        self, ds: xr.Dataset, time_range: Tuple[str, str], cache_key: Optional[str] = None
+    ) -> xr.Dataset:
         """
         Subset dataset by time range.
 
@@ -562,6 +972,8 @@ class PDPDataDownloader:
             Input dataset.
         time_range : tuple of str
             (start_date, end_date) in ISO format.
+        cache_key : str, optional
+            Dataset path used to cache dimension detection across calls.
 
         Returns
         -------
@@ -570,17 +982,44 @@ class PDPDataDownloader:
         """
         start, end = time_range
 
-        time_dim = None
-        for dim in ["time", "date", "t"]:
-            if dim in ds.dims:
-                time_dim = dim
-                break
+        _, _, time_dim = self._detect_dims(ds, cache_key)
 
         if not time_dim:
             print("WARNING: No time dimension found, skipping temporal subsetting")
             return ds
 
         print(f"Temporal subsetting: {start} to {end}")
+
+        time_coord = ds[time_dim]
+        values = time_coord.values
+        units = str(time_coord.attrs.get("units", ""))
+        encoded = " since " in units and np.issubdtype(values.dtype, np.number)
+
+        # Bounds cover whole periods with an exclusive end, like partial-string sel
+        lo = hi = None
+        try:
+            bounds = pd.DatetimeIndex(
+                [pd.Period(start).start_time, (pd.Period(end) + 1).start_time]
+            )
+            if encoded:
+                # Undecoded time axis: encode the bounds instead of decoding the axis
+                (lo, hi), _, _ = encode_cf_datetime(
+                    bounds.values, units, time_coord.attrs.get("calendar")
+                )
+            elif np.issubdtype(values.dtype, np.datetime64):
+                lo, hi = bounds.values.astype(values.dtype)
+        except Exception:
+            pass
+
+        if lo is not None and values.size and values[0] <= values[-1]:
+            # Sorted axis: binary search gives the positional range directly
+            i0 = int(np.searchsorted(values, lo, side="left"))
+            i1 = int(np.searchsorted(values, hi, side="left"))
+            return ds.isel({time_dim: slice(i0, i1)})
+
+        # Other calendars or unsorted axes: label-based selection on decoded times
+        if encoded:
+            ds = xr.decode_cf(ds)
         ds_subset = ds.sel({time_dim: slice(start, end)})
 
         return ds_subset
@@ -606,27 +1045,55 @@ class PDPDataDownloader:
             "catchment_shp": str(self.catchment_shp),
         }
 
-        self.download_history["downloads"].append(log_entry)
-        self._save_download_history()
+        # download_all logs from worker threads
+        with self._history_lock:
+            self.download_history["downloads"].append(log_entry)
+            self._append_download_history(log_entry)
 
-    def download_all(self, time_range: Optional[Tuple[str, str]] = None):
+    def download_all(
+        self,
+        time_range: Optional[Tuple[str, str]] = None,
+        max_workers: int = 8,
+    ):
         """
         Download all datasets in the catalog.
 
+        Datasets are downloaded concurrently; each download is I/O-bound on Azure
+        reads and the local write.
+
         Parameters
         ----------
         time_range : tuple of str, optional
             Time range for temporal datasets.
+        max_workers : int, default 8
+            Maximum number of datasets downloaded at the same time.
         """
         print("Starting batch download of all datasets")
 
-        for category, subcategories in self.dataset_catalog.items():
-            for subcategory in subcategories.keys():
+        datasets = [
+            (category, subcategory)
+            for category, subcategories in self.dataset_catalog.items()
+            for subcategory in subcategories.keys()
+        ]
+
+        self._prefetch_metadata(datasets)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                executor.submit(
+                    self.download_dataset, category, subcategory, time_range=time_range
+                ): (category, subcategory)
+                for category, subcategory in datasets
+            }
+            for future in as_completed(futures):
+                category, subcategory = futures[future]
                 try:
-                    self.download_dataset(category, subcategory, time_range=time_range)
+                    future.result()
                 except Exception as e:
                     print(f"ERROR: Failed to download {category}/{subcategory}: {e}")
-                    continue
+
+        if self.use_local_cache:
+            self.clear_cache()
 
         print("Batch download complete")
 
@@ -9,11 +9,19 @@ Date: January 2026
 """
 
 import json
+import logging
 import os
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # optional fast JSON serializer
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 
 class PDPFolderStructure:
     """
@@ -39,10 +47,13 @@ class PDPFolderStructure:
         """
         self.base_path = Path(base_path) if base_path else Path.cwd()
         self.structure = custom_structure if custom_structure else self.FOLDER_STRUCTURE
+        self._created_at = None
 
-    def _create_directory_recursive(self, structure: Dict, parent_path: Path):
+    def _flatten_structure(
+        self, structure: Dict, parent_path: Path
+    ) -> List[Tuple[Path, str, bool]]:
         """
-        Recursively create directory structure from nested dictionary.
+        Flatten a nested folder structure into a parent-first list of directories.
 
         Parameters
         ----------
@@ -50,21 +61,44 @@ class PDPFolderStructure:
             Nested dictionary representing folder structure.
         parent_path : Path
             Parent directory path.
+
+        Returns
+        -------
+        list of tuple
+            (folder_path, folder_name, is_leaf) for each directory, parents before children.
         """
+        folders = []
         for folder_name, substructure in structure.items():
             folder_path = parent_path / folder_name
+            folders.append((folder_path, folder_name, not substructure))
+            if substructure:
+                folders.extend(self._flatten_structure(substructure, folder_path))
+        return folders
 
+    def _create_directory_recursive(self, structure: Dict, parent_path: Path):
+        """
+        Create directory structure from nested dictionary.
+
+        Directories are created parent-first, so no ``mkdir(parents=True)`` walk is
+        needed for each one.
+
+        Parameters
+        ----------
+        structure : dict
+            Nested dictionary representing folder structure.
+        parent_path : Path
+            Parent directory path (must already exist).
+        """
+        folders = self._flatten_structure(structure, parent_path)
+        for folder_path, folder_name, is_leaf in folders:
             # Create directory
-            folder_path.mkdir(parents=True, exist_ok=True)
-            print(f"Created: {folder_path}")
+            folder_path.mkdir(exist_ok=True)
 
             # Create README if it's a leaf directory
-            if not substructure:
+            if is_leaf:
                 self._create_readme(folder_path, folder_name)
 
-            # Recursively create subdirectories
-            if substructure:
-                self._create_directory_recursive(substructure, folder_path)
+        logger.info("Created %d directories under %s", len(folders), parent_path)
 
     def _create_readme(self, folder_path: Path, folder_name: str):
         """
@@ -78,11 +112,17 @@ class PDPFolderStructure:
             Name of the directory.
         """
         readme_path = folder_path.joinpath("README.md")
-        if not readme_path.exists():
-            with open(readme_path, "w") as f:
-                f.write(f"# {folder_name.replace('_', ' ').title()}\n\n")
-                f.write(f"This folder contains {folder_name.replace('_', ' ')} data.\n\n")
-                f.write(f"Created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        try:
+            f = open(readme_path, "x")
+        except FileExistsError:
+            return
+        label = folder_name.replace("_", " ")
+        # Outside create_structure there is no shared run timestamp yet
+        created_at = self._created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with f:
+            f.write(f"# {label.title()}\n\n")
+            f.write(f"This folder contains {label} data.\n\n")
+            f.write(f"Created: {created_at}\n")
 
     def create_structure(self):
         """
@@ -93,18 +133,21 @@ class PDPFolderStructure:
         Path
             Path to the created base directory.
         """
-        print(f"Creating PDP folder structure at: {self.base_path}")
+        logger.info("Creating PDP folder structure at: %s", self.base_path)
 
         # Create base directory
         self.base_path.mkdir(parents=True, exist_ok=True)
 
+        # One timestamp shared by all README files of this run
+        self._created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
         # Create main structure
         self._create_directory_recursive(self.structure, self.base_path)
 
         # Create project metadata file
         self._create_metadata_file()
 
-        print("Folder structure created successfully!")
+        logger.info("Folder structure created successfully!")
         return self.base_path
 
     def _create_metadata_file(self):
@@ -118,8 +161,11 @@ class PDPFolderStructure:
         }
 
         metadata_path = self.base_path / ".pdp_metadata.json"
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+        if orjson is not None:
+            metadata_path.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+        else:
+            with open(metadata_path, "w") as f:
+                json.dump(metadata, f, indent=2)
 
     def get_dataset_path(self, category: str, subcategory: str) -> Path:
         """
@@ -149,13 +195,37 @@ class PDPFolderStructure:
             List of all directory paths relative to base_path.
         """
         dirs = []
-        for root, dirnames, _ in os.walk(self.base_path):
-            for dirname in dirnames:
-                full_path = Path(root).joinpath(dirname)
-                rel_path = full_path.relative_to(self.base_path)
-                dirs.append(str(rel_path))
+        self._scan_dirs("", str(self.base_path), dirs)
         return sorted(dirs)
 
+    @staticmethod
+    def _scan_dirs(rel_dir: str, abs_dir: str, out: List[str]):
+        """
+        Recursively collect subdirectory paths relative to the scan root.
+
+        Like ``os.walk``, symlinked directories are listed but not descended into and
+        unreadable directories are skipped.
+
+        Parameters
+        ----------
+        rel_dir : str
+            Path of ``abs_dir`` relative to the scan root ("" for the root itself).
+        abs_dir : str
+            Directory to scan.
+        out : list of str
+            List the relative directory paths are appended to.
+        """
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir():
+                child = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                out.append(child)
+                if not entry.is_symlink():
+                    PDPFolderStructure._scan_dirs(child, entry.path, out)
+
     def verify_structure(self) -> Dict[str, bool]:
         """
         Verify that all expected directories exist.
@@ -224,6 +294,7 @@ if __name__ == "__main__":
     )
 
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
     print("Creating PHISHES Digital Platform folder structure...")
     base = create_pdp_folders(base_path=args.path)
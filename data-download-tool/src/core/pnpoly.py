@@ -0,0 +1,80 @@
+"""
+PHISHES Digital Platform - Point-in-Polygon Kernel
+
+Numba implementation of the PNPoly crossing-number test, used to mask dense grids to a
+catchment. Requires the optional ``numba`` dependency
+(``pip install phishes-data-downloader[numba]``).
+"""
+
+from typing import Iterable
+
+import numba
+import numpy as np
+import shapely.geometry
+
+from ..analysis.polyclip import pack_rings
+
+
+@numba.njit(parallel=True, cache=True)
+def pnpoly_mask(vertex_x, vertex_y, ring_starts, grid_x, grid_y, out):
+    """
+    Flag the grid points inside a set of rings (even-odd rule).
+
+    Vertices are stored as two flat arrays (structure of arrays); ring ``r`` spans
+    ``ring_starts[r]:ring_starts[r + 1]``. Holes and multiple parts need no special
+    handling under the even-odd rule.
+    """
+    n_rings = ring_starts.size - 1
+    for i in numba.prange(grid_y.size):
+        py = grid_y[i]
+        for j in range(grid_x.size):
+            px = grid_x[j]
+            inside = False
+            for r in range(n_rings):
+                a = ring_starts[r]
+                b = ring_starts[r + 1]
+                k = b - 1
+                for m in range(a, b):
+                    if (vertex_y[m] > py) != (vertex_y[k] > py):
+                        x_cross = (vertex_x[k] - vertex_x[m]) * (py - vertex_y[m]) / (
+                            vertex_y[k] - vertex_y[m]
+                        ) + vertex_x[m]
+                        if px < x_cross:
+                            inside = not inside
+                    k = m
+            out[i, j] = inside
+
+
+def grid_mask(
+    geometries: Iterable[shapely.geometry.base.BaseGeometry],
+    grid_x: np.ndarray,
+    grid_y: np.ndarray,
+) -> np.ndarray:
+    """
+    Compute which grid points fall inside the given (multi)polygons.
+
+    Parameters
+    ----------
+    geometries : iterable of shapely geometries
+        Polygons or MultiPolygons, in the same CRS as the grid.
+    grid_x, grid_y : numpy.ndarray
+        1D coordinates of the grid points.
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean array of shape ``(len(grid_y), len(grid_x))``.
+    """
+    # Ring signs and bounds are not needed, holes cancel out under the even-odd rule
+    coords, ring_starts, _, _ = pack_rings(list(geometries))
+
+    out = np.zeros((grid_y.size, grid_x.size), dtype=np.bool_)
+    pnpoly_mask(
+        np.ascontiguousarray(coords[:, 0]),
+        np.ascontiguousarray(coords[:, 1]),
+        ring_starts,
+        np.asarray(grid_x, dtype=np.float64),
+        np.asarray(grid_y, dtype=np.float64),
+        out,
+    )
+    return out
@@ -4,17 +4,28 @@ PHISHES Digital Platform - Utility Functions
 Provides helper functions for data loading, visualization, and processing.
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union, Iterable, Mapping, Optional
+from typing import Any, Dict, List, Union, Iterable, Mapping, Optional
 
+import functools
 import gc
+import json
+import logging
+import mmap
+import os
 import shutil
+import sys
+import threading
 import time
 
 import xarray as xr
 import numpy as np
 import mikeio
 
+logger = logging.getLogger(__name__)
+
 
 def get_grid_resolution(
     coords: Union[xr.DataArray, np.ndarray],
@@ -35,11 +46,103 @@ def get_grid_resolution(
     float
         Resolution (spacing) of the coordinate.
     """
-    if hasattr(coords, "values"):
-        coords = coords.values
-    if len(coords) < 2:
+    # Index the two values directly so lazy (Dask/Zarr-backed) coordinates are not loaded
+    try:
+        return abs(float(coords[1]) - float(coords[0]))
+    except (IndexError, TypeError):
         return default
-    return float(np.abs(coords[1] - coords[0]))
+
+
+def _make_retry_handler(max_retries: int, retry_delays: list):
+    """
+    Build a ``shutil.rmtree`` error handler that retries a failed removal.
+
+    Only the entry that failed is retried, with progressive delays, so a transient
+    lock on one file does not restart the removal of the whole tree.
+    """
+
+    def _retry_handler(func, failed_path, exc_info):
+        error = exc_info[1] if isinstance(exc_info, tuple) else exc_info
+        if func not in (os.unlink, os.remove, os.rmdir):
+            raise error
+        if isinstance(error, FileNotFoundError):
+            # Already gone (e.g. removed concurrently), nothing to retry
+            return
+
+        for attempt in range(1, max_retries):
+            delay = retry_delays[min(attempt - 1, len(retry_delays) - 1)]
+            # str(error) carries the errno and message, e.g. "[Errno 13] Permission denied"
+            print(
+                f"WARNING: Could not remove {failed_path}, retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{max_retries}): {error}"
+            )
+            time.sleep(delay)
+            try:
+                func(failed_path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError as e:
+                error = e
+
+        print(f"ERROR: Failed to remove after {max_retries} attempts: {error}")
+        raise error
+
+    return _retry_handler
+
+
+def _rmtree(path: Path, error_handler) -> None:
+    """Call ``shutil.rmtree`` with the error-handler keyword of the running Python."""
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=error_handler)
+    else:
+        shutil.rmtree(path, onerror=error_handler)
+
+
+def _unlink_batch(paths: List[str]) -> None:
+    """Unlink a batch of files, in order."""
+    for file_path in paths:
+        os.unlink(file_path)
+
+
+def _parallel_rmtree(path: Path, max_workers: Optional[int] = None, batch_size: int = 256) -> None:
+    """
+    Remove a directory tree, unlinking files from a thread pool.
+
+    Files are collected with ``os.scandir``, grouped per directory into batches of
+    ``batch_size`` and each batch is deleted by one worker; directories are removed
+    afterwards, deepest first. Used for Zarr stores, where deleting thousands of small
+    chunk files one at a time is syscall-bound.
+
+    Like ``shutil.rmtree``, a symlinked root is refused (``OSError``) before anything is
+    deleted, so the link target is left untouched.
+    """
+    if os.path.islink(path):
+        raise OSError(f"Cannot call rmtree on a symbolic link: {path}")
+
+    batches, dirs = [], []
+    pending = [str(path)]
+    while pending:
+        current = pending.pop()
+        dirs.append(current)
+        files = []
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                else:
+                    files.append(entry.path)
+        batches.extend(files[i : i + batch_size] for i in range(0, len(files), batch_size))
+
+    if len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            list(executor.map(_unlink_batch, batches))
+    else:
+        for batch in batches:
+            _unlink_batch(batch)
+
+    for directory in reversed(dirs):
+        os.rmdir(directory)
 
 
 def remove_path_with_retry(
@@ -55,7 +158,7 @@ def remove_path_with_retry(
     path : Path
         Path to remove.
     max_retries : int, default 5
-        Maximum number of retry attempts.
+        Maximum number of attempts per file or directory entry.
     retry_delays : list, optional
         Progressive delay times in seconds. Defaults to [0.5, 1.0, 2.0, 3.0, 5.0].
 
@@ -72,29 +175,57 @@ def remove_path_with_retry(
     if not path.exists():
         return False
 
-    retry_delays = retry_delays or [0.5, 1.0, 2.0, 3.0, 5.0]
-
-    for attempt in range(max_retries):
+    if _evict_open_datasets(path):
+        # Release the file handles held by the evicted datasets before deleting
+        gc.collect()
+
+    retry_handler = _make_retry_handler(max_retries, retry_delays or [0.5, 1.0, 2.0, 3.0, 5.0])
+
+    if path.is_dir():
+        if path.is_symlink():
+            # Refuse it as shutil.rmtree does, rather than emptying the link target
+            raise OSError(f"Cannot call rmtree on a symbolic link: {path}")
+        if sys.platform == "win32" or path.suffix == ".zarr":
+            try:
+                _parallel_rmtree(path)
+            except OSError:
+                # Locked leftovers are handled by the retrying rmtree below
+                pass
+        if path.exists():
+            _rmtree(path, retry_handler)
+    else:
         try:
-            if path.is_dir():
-                shutil.rmtree(path, ignore_errors=False)
-            else:
-                path.unlink()
-            print(f"Removed: {path}")
-            return True
-        except (PermissionError, OSError) as e:
-            if attempt < max_retries - 1:
-                delay = retry_delays[min(attempt, len(retry_delays) - 1)]
-                print(
-                    f"WARNING: File locked, retrying in {delay:.1f}s "
-                    f"(attempt {attempt + 1}/{max_retries}): {e}"
-                )
-                time.sleep(delay)
-            else:
-                print(f"ERROR: Failed to remove after {max_retries} attempts: {e}")
-                raise
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            retry_handler(os.unlink, path, e)
+
+    print(f"Removed: {path}")
+    return True
+
+
+@functools.lru_cache(maxsize=32)
+def get_transformer(src_crs, dst_crs):
+    """
+    Return a cached ``pyproj.Transformer`` between two CRS (``always_xy=True``).
+
+    Building a transformer involves a PROJ database lookup that costs tens of
+    milliseconds, so transformers are reused for repeated CRS pairs.
 
-    return False
+    Parameters
+    ----------
+    src_crs, dst_crs : str or pyproj.CRS
+        Source and target CRS, in any form accepted by ``pyproj.CRS.from_user_input``.
+
+    Returns
+    -------
+    pyproj.Transformer
+        Transformer taking (x, y) / (lon, lat) ordered coordinates.
+    """
+    import pyproj
+
+    return pyproj.Transformer.from_crs(src_crs, dst_crs, always_xy=True)
 
 
 def build_dataset_path(
@@ -134,33 +265,308 @@ def build_dataset_path(
     )
 
 
-def open_dataset_any(path: Union[str, Path]) -> xr.Dataset:
+# Encoding keys describing how values are stored (packing, fill value, time units);
+# kept from the source so writing with an explicit encoding does not unpack the data
+_PACKING_KEYS = ("dtype", "scale_factor", "add_offset", "_FillValue", "units", "calendar")
+
+
+def _packing_encoding(var: xr.DataArray) -> Dict[str, Any]:
+    """Return the storage (packing) keys of a variable's source encoding."""
+    return {key: var.encoding[key] for key in _PACKING_KEYS if key in var.encoding}
+
+
+def get_dataset_encoding(
+    ds: xr.Dataset,
+    output_format: str = "nc",
+    spatial_chunk: int = 256,
+    compression_level: int = 0,
+    time_chunk: int = 256,
+    max_chunk_bytes: int = 64 * 2**20,
+    time_dim: Optional[str] = "time",
+) -> Dict[str, Dict[str, Any]]:
     """
-    Open a dataset from Zarr, NetCDF, or DFS2 format.
+    Suggest a per-variable write encoding for a dataset path from :func:`build_dataset_path`.
 
-    Automatically detects the format based on file extension and opens accordingly.
+    NetCDF outputs are chunked with up to ``time_chunk`` time steps (capped so a chunk
+    stays below ``max_chunk_bytes``) and ``spatial_chunk`` x ``spatial_chunk`` cells,
+    uncompressed unless ``compression_level`` is set. Zarr outputs get blosc/lz4.
+    Other formats return an empty encoding. The packing keys of each variable's
+    source encoding (``dtype``, ``scale_factor``, ``add_offset``, ``_FillValue``, and
+    time ``units``/``calendar``) are kept, so packed data is written packed again.
 
     Parameters
     ----------
-    path : str or Path
-        Path to the dataset file (.zarr folder or .nc file).
+    ds : xarray.Dataset
+        Dataset about to be written.
+    output_format : str, optional
+        Output format, "nc", "zarr", or "dfs2". Default is "nc".
+    spatial_chunk : int, optional
+        Chunk size along non-time dimensions for NetCDF outputs. Default is 256.
+    compression_level : int, optional
+        zlib level (1-9) for NetCDF outputs, 0 disables compression. Default is 0.
+    time_chunk : int, optional
+        Maximum time steps per NetCDF chunk. Default is 256.
+    max_chunk_bytes : int, optional
+        Upper bound on the uncompressed size of a NetCDF chunk. Default is 64 MiB.
+    time_dim : str, optional
+        Name of the time dimension (e.g. "date" or "t"), None if there is none.
+        Default is "time".
 
     Returns
     -------
-    xarray.Dataset
-        Opened dataset.
+    dict
+        Mapping of variable name to encoding, for ``to_netcdf``/``to_zarr``.
 
     Examples
     --------
-    >>> ds = open_dataset_any(Path("data").joinpath("climate", "temperature", "temperature.zarr"))
-    >>> ds = open_dataset_any(Path("data").joinpath("climate", "temperature", "temperature.nc"))
+    >>> path = build_dataset_path(Path("data/my_project"), "climate", "precipitation")
+    >>> ds.to_netcdf(path, encoding=get_dataset_encoding(ds, "nc"))
     """
-    path = Path(path)
+    output_format = output_format.lower()
+    encoding: Dict[str, Dict[str, Any]] = {}
+
+    if output_format == "nc":
+        for name, var in ds.data_vars.items():
+            if var.ndim == 0 or var.dtype.kind not in "biuf":
+                continue
+            packing = _packing_encoding(var)
+            itemsize = np.dtype(packing.get("dtype", var.dtype)).itemsize
+            spatial = [min(size, spatial_chunk) for size in var.shape]
+            slice_bytes = itemsize * int(
+                np.prod([c for dim, c in zip(var.dims, spatial) if dim != time_dim])
+            )
+            steps = max(1, min(time_chunk, max_chunk_bytes // max(slice_bytes, 1)))
+            chunksizes = tuple(
+                min(size, steps) if dim == time_dim else chunk
+                for dim, size, chunk in zip(var.dims, var.shape, spatial)
+            )
+            encoding[name] = {**packing, "zlib": compression_level > 0, "chunksizes": chunksizes}
+            if compression_level > 0:
+                encoding[name]["complevel"] = compression_level
+    elif output_format == "zarr":
+        import numcodecs
+        import zarr
+
+        compressor = numcodecs.Blosc(cname="lz4", clevel=5, shuffle=numcodecs.Blosc.SHUFFLE)
+        if int(zarr.__version__.split(".")[0]) >= 3:
+            codec = {"compressors": (compressor,)}
+        else:
+            codec = {"compressor": compressor}
+        encoding = {name: {**_packing_encoding(var), **codec} for name, var in ds.data_vars.items()}
+
+    return encoding
+
+
+def get_write_chunks(
+    ds: xr.Dataset,
+    spatial_chunk: int = 256,
+    min_chunk_bytes: int = 2**20,
+    time_dim: Optional[str] = "time",
+) -> Dict[str, int]:
+    """
+    Suggest dask chunks for writing a dataset so each output chunk holds at least
+    ``min_chunk_bytes``.
+
+    Non-time dimensions are chunked by up to ``spatial_chunk`` cells, and as many time
+    steps are grouped as needed to reach ``min_chunk_bytes``. Small catchment subsets
+    otherwise inherit tiny chunks from the source store, and per-chunk overhead
+    dominates compression and writing.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset about to be written.
+    spatial_chunk : int, optional
+        Chunk size along non-time dimensions. Default is 256.
+    min_chunk_bytes : int, optional
+        Target minimum uncompressed chunk size. Default is 1 MiB.
+    time_dim : str, optional
+        Name of the time dimension (e.g. "date" or "t"), None if there is none.
+        Default is "time".
+
+    Returns
+    -------
+    dict
+        Mapping of dimension name to chunk size, for ``Dataset.chunk``.
+    """
+    chunks = {dim: min(size, spatial_chunk) for dim, size in ds.sizes.items() if dim != time_dim}
+    if time_dim in ds.sizes:
+        itemsize = max((var.dtype.itemsize for var in ds.data_vars.values()), default=1)
+        slice_bytes = itemsize * int(np.prod(list(chunks.values())))
+        steps = -(-min_chunk_bytes // max(slice_bytes, 1))
+        chunks[time_dim] = max(1, min(ds.sizes[time_dim], steps))
+    return chunks
+
+
+def _prefetch_coords(ds: xr.Dataset, max_workers: int = 8) -> xr.Dataset:
+    """Load the lazily-backed (non-index) coordinates of a dataset concurrently."""
+    names = [name for name in ds.coords if name not in ds.indexes]
+    if not names:
+        return ds
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as executor:
+        values = list(executor.map(lambda name: np.asarray(ds[name].variable.values), names))
+
+    return ds.assign_coords(
+        {name: ds[name].variable.copy(data=data) for name, data in zip(names, values)}
+    )
+
+
+def _is_uncompressed_zarr(path: Path) -> bool:
+    """Check whether every array of a consolidated Zarr v2 store is stored uncompressed."""
+    try:
+        metadata = json.loads((path / ".zmetadata").read_text(encoding="utf-8"))["metadata"]
+    except (OSError, ValueError, KeyError):
+        return False
+    arrays = [meta for key, meta in metadata.items() if key.endswith(".zarray")]
+    return bool(arrays) and all(
+        meta.get("compressor") is None and not meta.get("filters") for meta in arrays
+    )
+
+
+def _map_file(path: Union[str, Path]):
+    """Memory-map a file read-only (an empty file, which cannot be mapped, is read)."""
+    with open(path, "rb") as fh:
+        try:
+            return memoryview(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:  # empty file
+            return fh.read()
+
+
+def _memory_mapped_store(path: Path):
+    """
+    Build a local Zarr store that memory-maps chunk files instead of reading them.
 
+    Uncompressed chunks are then decoded straight from the page cache, without copying
+    each file into a bytes object first. Returns None on Windows, where a mapped chunk
+    keeps its file locked until the array is released.
+    """
+    if sys.platform == "win32":
+        return None
+
+    import zarr
+
+    if int(zarr.__version__.split(".")[0]) < 3:
+        from zarr.storage import DirectoryStore
+
+        class MemoryMappedDirectoryStore(DirectoryStore):
+            def _fromfile(self, fn):
+                return _map_file(fn)
+
+        return MemoryMappedDirectoryStore(str(path))
+
+    from zarr.core.buffer import default_buffer_prototype
+    from zarr.storage import LocalStore
+
+    class MemoryMappedLocalStore(LocalStore):
+        def _get_mapped(self, key, prototype):
+            try:
+                data = _map_file(self.root / key)
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                return None
+            return (prototype or default_buffer_prototype()).buffer.from_bytes(data)
+
+        async def get(self, key, prototype=None, byte_range=None):
+            if byte_range is not None:
+                return await super().get(key, prototype, byte_range)
+            if not self._is_open:
+                await self._open()
+            return self._get_mapped(key, prototype)
+
+        def get_sync(self, key, *, prototype=None, byte_range=None):
+            # Chunk reads of recent zarr releases go through this synchronous path
+            if byte_range is not None:
+                return super().get_sync(key, prototype=prototype, byte_range=byte_range)
+            self._ensure_open_sync()
+            return self._get_mapped(key, prototype)
+
+    return MemoryMappedLocalStore(path, read_only=True)
+
+
+def _dataset_mtime_ns(path: Path) -> int:
+    """Modification time of a dataset, including the metadata files of Zarr stores."""
+    mtime_ns = path.stat().st_mtime_ns
+    if path.is_dir():
+        for name in (".zmetadata", "zarr.json"):
+            metadata = path / name
+            if metadata.exists():
+                mtime_ns = max(mtime_ns, metadata.stat().st_mtime_ns)
+    return mtime_ns
+
+
+# Datasets opened by open_dataset_any(cache=True), least recently used first. Keyed by
+# (absolute path, modification time, options) so single paths can be evicted
+_OPEN_DATASET_CACHE_SIZE = 32
+_open_dataset_cache: "OrderedDict[tuple, xr.Dataset]" = OrderedDict()
+_open_dataset_cache_lock = threading.Lock()
+
+
+def _open_dataset_cached(
+    path_str: str,
+    mtime_ns: int,
+    chunks_key,
+    use_tensorstore: bool,
+    prefetch_coords: bool,
+) -> xr.Dataset:
+    """Open a dataset once per (path, modification time, options)."""
+    key = (path_str, mtime_ns, chunks_key, use_tensorstore, prefetch_coords)
+    with _open_dataset_cache_lock:
+        if key in _open_dataset_cache:
+            _open_dataset_cache.move_to_end(key)
+            return _open_dataset_cache[key]
+
+    chunks = dict(chunks_key) if isinstance(chunks_key, frozenset) else chunks_key
+    ds = _open_dataset(Path(path_str), chunks, use_tensorstore, prefetch_coords)
+    with _open_dataset_cache_lock:
+        _open_dataset_cache[key] = ds
+        while len(_open_dataset_cache) > _OPEN_DATASET_CACHE_SIZE:
+            _open_dataset_cache.popitem(last=False)
+    return ds
+
+
+def _evict_open_datasets(path: Optional[Union[str, Path]] = None) -> bool:
+    """
+    Drop the datasets cached by :func:`open_dataset_any` at or under ``path``.
+
+    All cached datasets are dropped when ``path`` is None. Returns whether any were.
+    """
+    root = os.path.abspath(path) if path is not None else None
+    with _open_dataset_cache_lock:
+        keys = [
+            key
+            for key in _open_dataset_cache
+            if root is None or key[0] == root or key[0].startswith(root + os.sep)
+        ]
+        for key in keys:
+            del _open_dataset_cache[key]
+    return bool(keys)
+
+
+def _open_dataset(
+    path: Path,
+    chunks,
+    use_tensorstore: bool,
+    prefetch_coords: bool,
+) -> xr.Dataset:
+    """Open a dataset according to its file extension (see :func:`open_dataset_any`)."""
     if path.suffix == ".zarr" or path.is_dir():
-        return xr.open_zarr(path, consolidated=True)
+        if use_tensorstore:
+            try:
+                import xarray_tensorstore
+            except ImportError:
+                print("WARNING: xarray-tensorstore is not installed, using xarray.open_zarr")
+            else:
+                ds = xarray_tensorstore.open_zarr(str(path))
+                return _prefetch_coords(ds) if prefetch_coords else ds
+        # Uncompressed local stores are read through memory-mapped chunk files
+        store = _memory_mapped_store(path) if _is_uncompressed_zarr(path) else None
+        # consolidated=None reads .zmetadata when present (save_dataset always writes
+        # it) and falls back to listing the store otherwise instead of failing
+        ds = xr.open_zarr(store or path, consolidated=None, chunks=chunks)
+        return _prefetch_coords(ds) if prefetch_coords else ds
     elif path.suffix == ".nc":
-        return xr.open_dataset(path, engine="netcdf4")
+        ds = xr.open_dataset(path, engine="netcdf4", chunks=chunks)
+        return _prefetch_coords(ds) if prefetch_coords else ds
     elif path.suffix == ".dfs2":
         return mikeio.read(path).to_xarray().rename(x="lon", y="lat")
     else:
@@ -170,13 +576,77 @@ def open_dataset_any(path: Union[str, Path]) -> xr.Dataset:
         )
 
 
+def open_dataset_any(
+    path: Union[str, Path],
+    chunks: Optional[Union[int, dict, str]] = None,
+    use_tensorstore: bool = False,
+    prefetch_coords: bool = True,
+    cache: bool = False,
+) -> xr.Dataset:
+    """
+    Open a dataset from Zarr, NetCDF, or DFS2 format.
+
+    Automatically detects the format based on file extension and opens accordingly.
+
+    Parameters
+    ----------
+    path : str or Path
+        Path to the dataset file (.zarr folder or .nc file).
+    chunks : int, dict, or str, optional
+        Dask chunking passed to ``xarray.open_zarr`` and ``xarray.open_dataset``.
+        Defaults to ``{}``, which keeps the on-disk chunking and stays lazy. Avoid
+        ``"auto"``: it is slow to plan for stores with many chunks and raises
+        ``NotImplementedError`` for object-dtype variables.
+    use_tensorstore : bool, default False
+        If True, open Zarr stores with ``xarray-tensorstore``, which fetches chunks
+        concurrently. Falls back to ``xarray.open_zarr`` if the package is not installed.
+        TensorStore-backed arrays must be loaded with ``xarray_tensorstore.read()``
+        before being passed to ``xr.concat``.
+    prefetch_coords : bool, default True
+        If True, load non-index coordinates of Zarr and NetCDF datasets concurrently
+        right after opening, instead of one by one on first access.
+    cache : bool, default False
+        If True, reuse the dataset opened by an earlier call with the same path and
+        options, as long as the file has not been modified since. A deep copy is
+        returned, so changes to it do not affect the cached dataset. Cached datasets
+        keep their files open: :func:`remove_path_with_retry` evicts the entries at or
+        under the removed path, and :func:`cleanup_existing_dataset` clears the cache.
+
+    Returns
+    -------
+    xarray.Dataset
+        Opened dataset.
+
+    Examples
+    --------
+    >>> ds = open_dataset_any(Path("data").joinpath("climate", "temperature", "temperature.zarr"))
+    >>> ds = open_dataset_any(Path("data").joinpath("climate", "temperature", "temperature.nc"))
+    """
+    path = Path(path)
+    chunks = {} if chunks is None else chunks
+
+    if cache:
+        try:
+            mtime_ns = _dataset_mtime_ns(path)
+        except OSError:
+            pass
+        else:
+            chunks_key = frozenset(chunks.items()) if isinstance(chunks, dict) else chunks
+            ds = _open_dataset_cached(
+                os.path.abspath(path), mtime_ns, chunks_key, use_tensorstore, prefetch_coords
+            )
+            return ds.copy(deep=True)
+
+    return _open_dataset(path, chunks, use_tensorstore, prefetch_coords)
+
+
 def cleanup_existing_dataset(
     dataset_path: Union[str, Path],
     namespace: Optional[Mapping[str, object]] = None,
     dataset_var_names: Iterable[str] = ("ds", "ds_downloaded"),
 ) -> None:
     """
-    Close open datasets, force garbage collection, and remove existing dataset files.
+    Close open datasets, collect garbage if any were closed, and remove existing dataset files.
 
     This helps avoid Windows file locking errors when re-downloading data.
 
@@ -190,6 +660,8 @@ def cleanup_existing_dataset(
         Variable names to close if present in the namespace.
     """
     dataset_path = Path(dataset_path)
+    # Cached datasets may hold file handles too, release them with the namespace ones
+    released = _evict_open_datasets()
 
     if namespace:
         for name in dataset_var_names:
@@ -197,12 +669,14 @@ def cleanup_existing_dataset(
             if obj is not None and hasattr(obj, "close"):
                 try:
                     obj.close()
-                    print(f"Closed previously opened dataset '{name}'")
+                    released = True
+                    logger.debug("Closed previously opened dataset '%s'", name)
                 except Exception as exc:
-                    print(f"WARNING: Could not close dataset '{name}': {exc}")
+                    logger.warning("Could not close dataset '%s': %s", name, exc)
 
-    gc.collect()
-    print("Garbage collection completed. File handles released.")
+    if released:
+        gc.collect()
+        logger.debug("Garbage collection completed. File handles released.")
 
     try:
         removed = remove_path_with_retry(dataset_path)
@@ -233,17 +707,13 @@ def guess_data_variable(ds, filter_vars=["spatial_ref", "crs"]):
         str: The name of the guessed data variable.
 
     Raises:
-        ValueError: If the input is not an xarray Dataset.
+        ValueError: If the input is not an xarray Dataset or has no data variables.
     """
 
     if not isinstance(ds, xr.Dataset):
         raise ValueError(f"Unable to guess data variable for {type(ds)}. Need xr.Dataset.")
-    if filter_vars is not None:
-        if isinstance(filter_vars, str):
-            filter_vars = [filter_vars]
-
-        for v in iter(ds.data_vars.keys()):
-            if v not in filter_vars:
-                return v
-
-    return next(iter(ds.data_vars.keys()))
+    names = tuple(ds.data_vars)
+    if not names:
+        raise ValueError("Unable to guess data variable for a dataset without data variables.")
+    filter_set = {filter_vars} if isinstance(filter_vars, str) else set(filter_vars or ())
+    return next((v for v in names if v not in filter_set), names[0])
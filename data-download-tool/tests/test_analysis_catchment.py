@@ -1,7 +1,8 @@
 import geopandas as gpd
+import numpy as np
 import pytest
 import xarray as xr
-from shapely.geometry import LineString, Point, Polygon
+from shapely.geometry import GeometryCollection, LineString, Point, Polygon
 
 from src.analysis import catchment
 
@@ -17,26 +18,66 @@ def test_get_geometry_type_variants():
     assert catchment._get_geometry_type(_gdf(LineString([(0, 0), (1, 1)]))) == "line"
     assert catchment._get_geometry_type(_gdf(Point(0, 0))) == "point"
 
+    mixed = gpd.GeoDataFrame(
+        {"geometry": [Point(0, 0), Polygon([(0, 0), (1, 0), (1, 1)])]}, crs="EPSG:4326"
+    )
+    assert catchment._get_geometry_type(mixed) == "polygon"
+    assert catchment._get_geometry_type(_gdf(GeometryCollection([Point(0, 0)]))) == "unknown"
+
 
 def test_buffer_geometry_returns_polygon():
     gdf = _gdf(Point(10.0, 50.0))
-    buffered = catchment._buffer_geometry(gdf, buffer_distance_m=1000)
+    buffered, crs = catchment._buffer_geometry(gdf, buffer_distance_m=1000)
     assert catchment._get_geometry_type(buffered) == "polygon"
+    assert crs == "EPSG:3035"
+    assert buffered.crs == "EPSG:3035"
+
+
+def test_load_catchment_buffers_into_target_crs(tmp_path):
+    shp_path = tmp_path / "outlet.gpkg"
+    _gdf(Point(10.0, 50.0)).to_file(shp_path)
+
+    gdf, merged = catchment.load_catchment(shp_path, validate_size=False)
+    assert gdf.crs == "EPSG:4326"
+    assert merged.geom_type == "Polygon"
+
+    gdf, _ = catchment.load_catchment(shp_path, target_crs="EPSG:3857", validate_size=False)
+    assert gdf.crs == "EPSG:3857"
 
 
 def test_validate_europe_aoi():
     valid, frac, _ = catchment._validate_europe_aoi(
-        _gdf(Polygon([(10, 50), (11, 50), (11, 51), (10, 51)]))
+        Polygon([(10, 50), (11, 50), (11, 51), (10, 51)])
     )
     assert valid is True
-    assert frac > 0
+    assert frac == 1.0
 
+    # Crosses the western AOI edge: 1 of 4 degrees wide lies inside
+    valid, frac, _ = catchment._validate_europe_aoi(
+        Polygon([(-28, 50), (-24, 50), (-24, 51), (-28, 51)])
+    )
+    assert valid is True
+    assert frac == pytest.approx(0.25)
 
-def test_validate_europe_aoi_no_crs():
-    gdf = gpd.GeoDataFrame({"geometry": [Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])]})
-    valid, _, message = catchment._validate_europe_aoi(gdf)
+    valid, frac, _ = catchment._validate_europe_aoi(
+        Polygon([(-80, 0), (-79, 0), (-79, 1), (-80, 1)])
+    )
     assert valid is False
-    assert "no CRS" in message
+    assert frac == 0.0
+
+
+def test_validate_catchment_size():
+    valid, area_km2, _ = catchment._validate_catchment_size(Polygon([(0, 0), (1000, 0), (0, 1000)]))
+    assert valid is True
+    assert area_km2 == pytest.approx(0.5)
+
+
+@pytest.mark.filterwarnings("ignore:.crs. was not provided")
+def test_load_catchment_no_crs(tmp_path):
+    shp_path = tmp_path / "no_crs.gpkg"
+    gpd.GeoDataFrame({"geometry": [Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])]}).to_file(shp_path)
+    with pytest.raises(ValueError, match="no CRS"):
+        catchment.load_catchment(shp_path, validate_size=False)
 
 
 def test_create_catchment_from_extent_and_invalid():
@@ -59,6 +100,24 @@ def test_load_catchment_from_extent_and_merge():
     assert merged is not None
 
 
+def test_load_catchment_merges_features_in_target_crs(tmp_path):
+    shp_path = tmp_path / "parts.gpkg"
+    gpd.GeoDataFrame(
+        {
+            "geometry": [
+                Polygon([(10, 50), (10.5, 50), (10.5, 50.5), (10, 50.5)]),
+                Polygon([(10.5, 50), (11, 50), (11, 50.5), (10.5, 50.5)]),
+            ]
+        },
+        crs="EPSG:4326",
+    ).to_file(shp_path)
+
+    gdf, merged = catchment.load_catchment(shp_path, target_crs="EPSG:3035")
+    assert gdf.crs == "EPSG:3035"
+    assert merged.geom_type == "Polygon"
+    assert merged.area == pytest.approx(gdf.geometry.area.sum())
+
+
 def test_validate_catchment_gdf_behaviors():
     one = _gdf(Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]))
     assert catchment.validate_catchment_gdf(one).equals(one)
@@ -74,6 +133,8 @@ def test_validate_catchment_gdf_behaviors():
     )
     merged = catchment.validate_catchment_gdf(multi)
     assert len(merged) == 1
+    assert catchment.validate_catchment_gdf(merged) is merged
+    assert catchment._validated_catchments.get(id(multi)) is None
 
     with pytest.raises(ValueError):
         catchment.validate_catchment_gdf(gpd.GeoDataFrame({"geometry": []}, crs="EPSG:4326"))
@@ -95,4 +156,75 @@ def test_compute_catchment_weights():
     geom = Polygon([(7.75, 49.75), (8.75, 49.75), (8.75, 50.75), (7.75, 50.75)])
     weights = catchment.compute_catchment_weights(ds, geom)
     assert weights.shape == (2, 2)
+    assert weights.dtype == np.float32
     assert float(weights.sum()) > 0
+
+
+def test_compute_catchment_weights_partial_cells():
+    ds = xr.Dataset(coords={"lat": [50.0, 51.0, 52.0], "lon": [8.0, 9.0, 10.0]})
+    geom = Polygon([(7.5, 49.5), (9.0, 49.5), (9.0, 51.5), (7.5, 51.5)])
+    weights = catchment.compute_catchment_weights(ds, geom)
+    expected = [[1.0, 0.5, 0.0], [1.0, 0.5, 0.0], [0.0, 0.0, 0.0]]
+    assert weights.values == pytest.approx(np.array(expected))
+
+
+@pytest.mark.parametrize("lat", [[50.0, 51.0, 52.0], [52.0, 51.0, 50.0]])
+def test_compute_catchment_weights_rasterize_matches_exact(lat):
+    ds = xr.Dataset(coords={"lat": lat, "lon": [8.0, 9.0, 10.0]})
+    geom = Polygon([(7.5, 49.5), (9.0, 49.5), (9.0, 51.5), (7.5, 51.5)])
+    exact = catchment.compute_catchment_weights(ds, geom)
+    rasterized = catchment.compute_catchment_weights(ds, geom, method="rasterize")
+    assert rasterized.values == pytest.approx(exact.values)
+
+    with pytest.raises(ValueError):
+        catchment.compute_catchment_weights(ds, geom, method="unknown")
+
+
+def test_compute_catchment_weights_numba_matches_exact():
+    pytest.importorskip("numba")
+    ds = xr.Dataset(coords={"lat": np.arange(49.0, 53.0, 0.5), "lon": np.arange(7.0, 11.0, 0.5)})
+    outer = [(7.3, 49.2), (10.4, 49.6), (9.1, 51.0), (10.2, 52.6), (7.6, 52.1)]
+    hole = [(8.0, 50.0), (8.6, 50.0), (8.6, 50.7), (8.0, 50.7)]
+    geom = Polygon(outer, [hole])
+    exact = catchment.compute_catchment_weights(ds, geom)
+    clipped = catchment.compute_catchment_weights(ds, geom, method="numba")
+    np.testing.assert_allclose(clipped.values, exact.values, atol=1e-6)
+
+
+def test_load_catchment_caches_unchanged_file(monkeypatch, tmp_path):
+    shp_path = tmp_path / "catchment.gpkg"
+    _gdf(Polygon([(10, 50), (11, 50), (11, 51), (10, 51)])).to_file(shp_path)
+    reads = []
+    read_file = gpd.read_file
+    monkeypatch.setattr(
+        catchment.gpd,
+        "read_file",
+        lambda path, **kwargs: reads.append(kwargs) or read_file(path, **kwargs),
+    )
+
+    first, _ = catchment.load_catchment(shp_path)
+    first["name"] = "changed"
+    second, _ = catchment.load_catchment(shp_path)
+    assert reads == [{"engine": "pyogrio"}]
+    assert "name" not in second
+
+    catchment.load_catchment(shp_path, target_crs="EPSG:3035")
+    assert len(reads) == 2
+
+
+def test_load_catchment_falls_back_without_pyogrio(monkeypatch, tmp_path):
+    shp_path = tmp_path / "fallback.gpkg"
+    _gdf(Polygon([(10, 50), (11, 50), (11, 51), (10, 51)])).to_file(shp_path)
+    engines = []
+    read_file = gpd.read_file
+
+    def fake_read_file(path, engine=None):
+        engines.append(engine)
+        if engine == "pyogrio":
+            raise ImportError("pyogrio")
+        return read_file(path)
+
+    monkeypatch.setattr(catchment.gpd, "read_file", fake_read_file)
+    gdf, _ = catchment.load_catchment(shp_path)
+    assert engines == ["pyogrio", None]
+    assert len(gdf) == 1
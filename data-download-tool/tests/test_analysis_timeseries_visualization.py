@@ -23,6 +23,16 @@ def test_compute_basin_average():
     assert float(basin.values[0]) == pytest.approx(2.5)
 
 
+def test_compute_basin_average_skips_missing_values():
+    data = xr.DataArray(
+        np.array([[[np.nan, 2.0], [3.0, 4.0]], [[1.0, 1.0], [1.0, 1.0]]]),
+        dims=("time", "lat", "lon"),
+    )
+    weights = xr.DataArray(np.array([[1.0, 1.0], [0.0, 0.0]]), dims=("lat", "lon"))
+    basin = compute_basin_average(data, weights)
+    np.testing.assert_allclose(basin.values, [1.0, 1.0])
+
+
 def test_compute_basin_average_raises_for_zero_weights():
     data = xr.DataArray(np.ones((1, 2, 2)), dims=("time", "lat", "lon"))
     weights = xr.DataArray(np.zeros((2, 2)), dims=("lat", "lon"))
@@ -38,6 +38,34 @@ def test_dfs_from_xr_uses_dataset_variable(monkeypatch):
     assert "x" in captured["grid"] and "y" in captured["grid"]
 
 
+def test_dfs_from_xr_single_column_uses_bbox(monkeypatch):
+    da = xr.DataArray(
+        np.ones((1, 2, 1)),
+        dims=("time", "lat", "lon"),
+        coords={"time": [0], "lat": [50.0, 50.5], "lon": [8.0]},
+    )
+    captured = {}
+
+    class FakeGrid2D:
+        def __init__(self, **kwargs):
+            captured["grid"] = kwargs
+
+    monkeypatch.setattr(dfsio.mikeio, "DataArray", lambda **kwargs: kwargs)
+    monkeypatch.setattr(dfsio.mikeio.spatial, "Grid2D", FakeGrid2D)
+    monkeypatch.setattr(dfsio, "ItemInfo", lambda *args: ("item",) + args)
+
+    dfsio.dfs_from_xr(da, "rain", eumtype="Precipitation_Rate", eumunit="mm_per_hour")
+    assert captured["grid"]["dx"] == 0.1
+    assert captured["grid"]["dy"] == 0.5
+    assert captured["grid"]["bbox"] == (8.0 - 0.05, 50.0 - 0.25, 8.0, 50.5)
+
+
+def test_axis_bounds_handles_descending_axes():
+    assert dfsio._axis_bounds(np.array([1.0, 2.0, 3.0])) == (1.0, 3.0)
+    assert dfsio._axis_bounds(np.array([3.0, 2.0, 1.0])) == (1.0, 3.0)
+    assert dfsio._axis_bounds(np.array([5.0])) == (5.0, 5.0)
+
+
 def test_create_file_writes_output(monkeypatch, tmp_path):
     da = _sample_dataarray()
     out = tmp_path / "maps" / "x.dfs2"
@@ -1,8 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import json
+import threading
 
+import dask
+import fsspec
 import geopandas as gpd
 import numpy as np
+import pandas as pd
 import pytest
+import shapely
 import xarray as xr
 from shapely.geometry import Polygon
 
@@ -41,11 +48,23 @@ def _new_downloader(tmp_path):
     d.buffer_cells = 1
     d.output_format = "nc"
     d.mask_on_catchment = False
+    d.validate_connection = False
+    d.use_numba = False
+    d.compression_level = 0
+    d.use_local_cache = False
+    d.cache_dir = tmp_path / "_cache"
+    d._cache_fs = None
     d.dataset_catalog = _minimal_catalog()
     d.catchment = _catchment_gdf()
     d.catchment_shp = Path("catchment.shp")
     d.download_history = {"downloads": []}
-    d.log_file = tmp_path / "logs" / "download_log.json"
+    d.log_file = tmp_path / "logs" / "download_log.jsonl"
+    d._history_lock = threading.Lock()
+    d._reproj_cache = {}
+    d._res_cache = {}
+    d._dims_cache = {}
+    d._zmetadata = {}
+    d._write_pool = ThreadPoolExecutor(max_workers=2)
     return d
 
 
@@ -71,6 +90,9 @@ def test_init_rejects_bad_inputs(monkeypatch, tmp_path):
     with pytest.raises(ValueError):
         PDPDataDownloader(catchment=_catchment_gdf(), output_base=tmp_path, output_format="bad")
 
+    with pytest.raises(ValueError):
+        PDPDataDownloader(catchment=_catchment_gdf(), output_base=tmp_path, compression_level=10)
+
 
 def test_set_output_format_and_get_dataset_info(tmp_path):
     d = _new_downloader(tmp_path)
@@ -89,14 +111,31 @@ def test_load_catalog(tmp_path, monkeypatch):
     loaded = PDPDataDownloader._load_catalog(d)
     assert "climate" in loaded
 
+    # Parsed once; every call returns an independent copy
+    loaded["climate"]["rain"]["description"] = "changed"
+    again = PDPDataDownloader._load_catalog(d)
+    assert again["climate"]["rain"]["description"] == "Rain"
+    assert again is not loaded
+
 
-def test_load_and_save_download_history(tmp_path):
+def test_load_and_append_download_history(tmp_path):
     d = _new_downloader(tmp_path)
-    d.download_history = {"downloads": [{"a": 1}]}
-    d._save_download_history()
+    d._append_download_history({"a": 1})
     loaded = d._load_download_history()
     assert loaded["downloads"][0]["a"] == 1
 
+    d._append_download_history({"a": 2})
+    assert d.log_file.read_text().splitlines() == ['{"a": 1}', '{"a": 2}']
+
+
+def test_load_download_history_reads_legacy_json(tmp_path):
+    d = _new_downloader(tmp_path)
+    d.log_file.parent.mkdir(parents=True)
+    legacy = d.log_file.with_suffix(".json")
+    legacy.write_text(json.dumps({"downloads": [{"a": 0}]}), encoding="utf-8")
+    d._append_download_history({"a": 1})
+    assert d._load_download_history()["downloads"] == [{"a": 0}, {"a": 1}]
+
 
 def test_setup_azure_connection(monkeypatch, tmp_path):
     class FakeFS:
@@ -104,7 +143,10 @@ def test_setup_azure_connection(monkeypatch, tmp_path):
             self.kwargs = kwargs
 
         def ls(self, _):
-            return ["ok"]
+            raise AssertionError("connection test must not list the container")
+
+        def exists(self, path):
+            return path == "zarr"
 
     monkeypatch.setattr(
         "src.core.downloader.adlfs.AzureBlobFileSystem", lambda **kwargs: FakeFS(**kwargs)
@@ -113,6 +155,13 @@ def test_setup_azure_connection(monkeypatch, tmp_path):
     fs = d._setup_azure_connection("abc")
     assert isinstance(fs, FakeFS)
 
+    d.validate_connection = True
+    assert isinstance(d._setup_azure_connection("abc"), FakeFS)
+
+    d.azure_container = "missing"
+    with pytest.raises(ConnectionError):
+        d._setup_azure_connection("abc")
+
 
 def test_load_catchment_delegates(monkeypatch, tmp_path):
     d = _new_downloader(tmp_path)
@@ -134,7 +183,7 @@ def test_open_dataset_tries_non_consolidated(monkeypatch, tmp_path):
     d.fs = FakeFS()
     calls = {"n": 0}
 
-    def fake_open_zarr(store, consolidated=True):
+    def fake_open_zarr(store, consolidated=True, **kwargs):
         calls["n"] += 1
         if calls["n"] == 1:
             raise RuntimeError("fail first")
@@ -145,6 +194,116 @@ def test_open_dataset_tries_non_consolidated(monkeypatch, tmp_path):
     assert ds["consolidated"] is False
 
 
+def test_prefetch_metadata_skips_consolidated_attempt(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    for name in ("temp", "wind", "snow"):
+        d.dataset_catalog["climate"][name] = {"path": f"climate/{name}.zarr"}
+    requested = []
+
+    class FakeFS:
+        def cat(self, paths, on_error="raise"):
+            requested.append(paths)
+            missing = FileNotFoundError("missing")
+            return {
+                "zarr/climate/rain.zarr/.zmetadata": b"{}",
+                "zarr/climate/rain.zarr/zarr.json": missing,
+                "zarr/climate/temp.zarr/.zmetadata": missing,
+                "zarr/climate/temp.zarr/zarr.json": missing,
+                # Zarr v3 store, consolidated metadata lives in zarr.json
+                "zarr/climate/wind.zarr/.zmetadata": missing,
+                "zarr/climate/wind.zarr/zarr.json": b"{}",
+                # Transient failure, not proof that the metadata is missing
+                "zarr/climate/snow.zarr/.zmetadata": TimeoutError("throttled"),
+                "zarr/climate/snow.zarr/zarr.json": missing,
+            }
+
+        def get_mapper(self, p):
+            return p
+
+    d.fs = FakeFS()
+    d._prefetch_metadata([("climate", name) for name in ("rain", "temp", "wind", "snow")])
+    assert len(requested) == 1
+    assert d._zmetadata == {"zarr/climate/rain.zarr": b"{}", "zarr/climate/temp.zarr": None}
+
+    calls = []
+    monkeypatch.setattr(
+        "src.core.downloader.xr.open_zarr",
+        lambda store, consolidated=True, **kwargs: calls.append(consolidated),
+    )
+    d.open_dataset("climate", "temp")
+    d.open_dataset("climate", "snow")
+    assert calls == [False, True]
+
+
+def test_open_dataset_serves_prefetched_metadata(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    d.fs = fsspec.filesystem("file")
+    d.azure_container = str(tmp_path / "remote")
+    store_path = tmp_path / "remote" / "climate" / "rain.zarr"
+    xr.Dataset({"rain": (("lat",), np.arange(3.0))}, coords={"lat": np.arange(3.0)}).to_zarr(
+        store_path, zarr_format=2, consolidated=True
+    )
+    d._prefetch_metadata([("climate", "rain")])
+
+    # The remote copy is gone, so a consolidated open only succeeds from memory
+    (store_path / ".zmetadata").unlink()
+    calls = []
+    original_open_zarr = xr.open_zarr
+
+    def spy_open_zarr(store, consolidated=None, **kwargs):
+        calls.append(consolidated)
+        return original_open_zarr(store, consolidated=consolidated, **kwargs)
+
+    monkeypatch.setattr("src.core.downloader.xr.open_zarr", spy_open_zarr)
+    ds = d.open_dataset("climate", "rain")
+    assert calls == [True]
+    assert ds["rain"].values.tolist() == [0.0, 1.0, 2.0]
+
+
+def test_open_dataset_through_local_cache(tmp_path):
+    d = _new_downloader(tmp_path)
+    d.fs = fsspec.filesystem("file")
+    d.azure_container = str(tmp_path / "remote")
+    d.use_local_cache = True
+    xr.Dataset({"rain": (("lat",), np.arange(3.0))}, coords={"lat": np.arange(3.0)}).to_zarr(
+        tmp_path / "remote" / "climate" / "rain.zarr", zarr_format=2, consolidated=True
+    )
+
+    ds = d.open_dataset("climate", "rain")
+    assert ds["rain"].values.tolist() == [0.0, 1.0, 2.0]
+    assert any(d.cache_dir.iterdir())
+
+    d.clear_cache()
+    assert not d.cache_dir.exists()
+
+
+def test_catchment_reproj_is_cached_per_crs(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    calls = []
+    monkeypatch.setattr(
+        "src.core.downloader.reproject_catchment",
+        lambda gdf, crs: calls.append(crs) or gdf.to_crs(crs),
+    )
+    gdf, bounds = d._get_catchment_reproj("EPSG:3035")
+    assert d._get_catchment_reproj("EPSG:3035")[0] is gdf
+    d._get_catchment_reproj("EPSG:4326")
+    assert calls == ["EPSG:3035", "EPSG:4326"]
+    assert list(bounds) == list(gdf.total_bounds)
+
+
+def test_catchment_bounds_transform_only_the_bbox(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    monkeypatch.setattr(
+        "src.core.downloader.reproject_catchment",
+        lambda gdf, crs: pytest.fail("bounds must not reproject the catchment"),
+    )
+    bounds = d._get_catchment_bounds("EPSG:3035")
+    exact = _catchment_gdf().to_crs("EPSG:3035").total_bounds
+    assert bounds[0] <= exact[0] and bounds[1] <= exact[1]
+    assert bounds[2] >= exact[2] and bounds[3] >= exact[3]
+    np.testing.assert_allclose(bounds, exact, rtol=1e-3)
+
+
 def test_process_dataset_calls_subset_methods(monkeypatch, tmp_path):
     d = _new_downloader(tmp_path)
     ds = xr.Dataset(
@@ -152,8 +311,8 @@ def test_process_dataset_calls_subset_methods(monkeypatch, tmp_path):
         coords={"time": [0], "lat": [0, 1], "lon": [0, 1]},
     )
     monkeypatch.setattr("src.core.downloader.reproject_catchment", lambda gdf, crs: gdf)
-    monkeypatch.setattr(d, "_spatial_subset", lambda ds, bounds, c, crs: ds)
-    monkeypatch.setattr(d, "_temporal_subset", lambda ds, tr: ds)
+    monkeypatch.setattr(d, "_spatial_subset", lambda ds, bounds, c, **kwargs: ds)
+    monkeypatch.setattr(d, "_temporal_subset", lambda ds, tr, **kwargs: ds)
     out = d.process_dataset(ds, "climate", "rain", time_range=("2000", "2001"), variables=["rain"])
     assert list(out.data_vars) == ["rain"]
 
@@ -175,13 +334,61 @@ def test_save_dataset_netcdf(monkeypatch, tmp_path):
     monkeypatch.setattr(d, "_log_download", lambda *args, **kwargs: None)
 
     called = {}
-    monkeypatch.setattr(
-        xr.Dataset, "to_netcdf", lambda self, path, mode, engine: called.__setitem__("path", path)
-    )
+
+    def fake_to_netcdf(self, path, mode, engine, encoding=None, compute=True):
+        called["path"] = path
+        called["engine"] = engine
+        called["encoding"] = encoding
+        called["compute"] = compute
+
+    monkeypatch.setattr(xr.Dataset, "to_netcdf", fake_to_netcdf)
 
     out = d.save_dataset(ds, "climate", "rain")
     assert out == output_path
     assert called["path"] == output_path
+    assert called["engine"] == "h5netcdf"
+    assert called["encoding"]["rain"]["zlib"] is False
+    assert called["compute"] is False
+
+
+def test_save_dataset_netcdf_writes_lazy_dataset(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    ds = xr.Dataset(
+        {"rain": (("time", "lat", "lon"), np.arange(32.0).reshape(2, 4, 4))},
+        coords={"time": [0, 1], "lat": np.arange(4.0), "lon": np.arange(4.0)},
+    ).chunk({"time": 1, "lat": 2, "lon": 2})
+    output_path = tmp_path / "rain.nc"
+    monkeypatch.setattr(
+        "src.core.downloader.build_dataset_path", lambda *args, **kwargs: output_path
+    )
+    monkeypatch.setattr(d, "_log_download", lambda *args, **kwargs: None)
+
+    d.save_dataset(ds, "climate", "rain")
+    with xr.open_dataset(output_path) as written:
+        np.testing.assert_array_equal(written["rain"].values, ds["rain"].values)
+        assert written["rain"].encoding["chunksizes"] == (2, 4, 4)
+
+
+def test_save_dataset_netcdf_keeps_fill_value_and_dtype(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    d.compression_level = 4
+    packed = xr.Dataset(
+        {"rain": (("lat", "lon"), np.array([[10, -9999], [25, 3]], dtype="int16"))},
+        coords={"lat": [0.0, 1.0], "lon": [0.0, 1.0]},
+    )
+    packed["rain"].attrs.update({"scale_factor": 0.1, "_FillValue": np.int16(-9999)})
+    output_path = tmp_path / "rain.nc"
+    monkeypatch.setattr(
+        "src.core.downloader.build_dataset_path", lambda *args, **kwargs: output_path
+    )
+    monkeypatch.setattr(d, "_log_download", lambda *args, **kwargs: None)
+
+    d.save_dataset(xr.decode_cf(packed), "climate", "rain")
+    with xr.open_dataset(output_path, decode_cf=False) as raw:
+        assert raw["rain"].dtype == np.int16
+        assert raw["rain"].attrs["_FillValue"] == -9999
+        assert raw["rain"].encoding["zlib"] is True
+        assert raw["rain"].encoding["complevel"] == 4
 
 
 def test_save_dataset_zarr_and_dfs2(monkeypatch, tmp_path):
@@ -197,12 +404,15 @@ def test_save_dataset_zarr_and_dfs2(monkeypatch, tmp_path):
     monkeypatch.setattr(d, "_log_download", lambda *args, **kwargs: None)
 
     zarr_called = {}
-    monkeypatch.setattr(
-        xr.Dataset, "to_zarr", lambda self, path, **kwargs: zarr_called.__setitem__("path", path)
-    )
+
+    def fake_to_zarr(self, path, **kwargs):
+        zarr_called["path"] = path
+        zarr_called["mode"] = kwargs["mode"]
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", fake_to_zarr)
     d.output_format = "zarr"
     d.save_dataset(ds, "climate", "rain")
-    assert zarr_called["path"] == out
+    assert zarr_called == {"path": out, "mode": "w-"}
 
     dfs_called = {}
     monkeypatch.setattr(
@@ -214,6 +424,55 @@ def test_save_dataset_zarr_and_dfs2(monkeypatch, tmp_path):
     assert dfs_called["ok"] is True
 
 
+def test_save_dataset_zarr_replaces_existing_store(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    d.output_format = "zarr"
+    out = tmp_path / "rain.zarr"
+    monkeypatch.setattr("src.core.downloader.build_dataset_path", lambda *args, **kwargs: out)
+    monkeypatch.setattr(d, "_log_download", lambda *args, **kwargs: None)
+
+    for n in (3, 2):
+        ds = xr.Dataset({"rain": (("lat",), np.arange(float(n)))}, coords={"lat": np.arange(n)})
+        d.save_dataset(ds, "climate", "rain")
+    assert xr.open_zarr(out)["rain"].values.tolist() == [0.0, 1.0]
+
+    # Tiny source chunks are merged into larger output chunks
+    ds = xr.Dataset(
+        {"rain": (("time", "lat", "lon"), np.ones((20, 4, 4)))},
+        coords={"time": np.arange(20), "lat": np.arange(4.0), "lon": np.arange(4.0)},
+    ).chunk({"time": 1, "lat": 2, "lon": 2})
+    d.save_dataset(ds, "climate", "rain")
+    assert xr.open_zarr(out)["rain"].encoding["chunks"] == (20, 4, 4)
+
+    # Time dimensions named other than "time" are grouped, not chunked as spatial dims
+    ds = xr.Dataset(
+        {"rain": (("date", "lat", "lon"), np.ones((300, 2, 2)))},
+        coords={"date": np.arange(300), "lat": np.arange(2.0), "lon": np.arange(2.0)},
+    ).chunk({"date": 1})
+    d.save_dataset(ds, "climate", "rain")
+    assert xr.open_zarr(out)["rain"].encoding["chunks"] == (300, 2, 2)
+
+
+def test_save_dataset_shares_write_pool(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    monkeypatch.setattr(d, "_log_download", lambda *args, **kwargs: None)
+    pools = []
+    original_compute = dask.compute
+
+    def spy_compute(*args, **kwargs):
+        pools.append(kwargs.get("pool"))
+        return original_compute(*args, **kwargs)
+
+    monkeypatch.setattr("src.core.downloader.dask.compute", spy_compute)
+    ds = xr.Dataset(
+        {"rain": (("lat", "lon"), np.ones((4, 4)))},
+        coords={"lat": np.arange(4.0), "lon": np.arange(4.0)},
+    ).chunk({"lat": 2})
+    for _ in range(2):
+        d.save_dataset(ds, "climate", "rain")
+    assert pools == [d._write_pool, d._write_pool]
+
+
 def test_download_dataset_pipeline(monkeypatch, tmp_path):
     d = _new_downloader(tmp_path)
     monkeypatch.setattr(d, "open_dataset", lambda *args, **kwargs: "raw")
@@ -229,7 +488,7 @@ def test_spatial_subset_and_temporal_subset(tmp_path):
         coords={"time": [0], "lat": [0.0, 0.5, 1.0], "lon": [0.0, 0.5, 1.0]},
     )
 
-    subset = d._spatial_subset(ds, (0.1, 0.1, 0.9, 0.9), _catchment_gdf(), "EPSG:4326")
+    subset = d._spatial_subset(ds, (0.1, 0.1, 0.9, 0.9), _catchment_gdf())
     assert subset.sizes["lat"] >= 1 and subset.sizes["lon"] >= 1
 
     no_time = xr.Dataset(
@@ -238,10 +497,179 @@ def test_spatial_subset_and_temporal_subset(tmp_path):
     assert d._temporal_subset(no_time, ("2000", "2001")).equals(no_time)
 
 
+def test_compute_bbox_slice_ascending_and_descending():
+    asc = np.array([0.0, 1.0, 2.0, 3.0])
+    assert PDPDataDownloader._compute_bbox_slice(asc, 0.5, 2.0) == slice(1, 3)
+    assert PDPDataDownloader._compute_bbox_slice(asc[::-1], 0.5, 2.0) == slice(1, 3)
+    assert PDPDataDownloader._compute_bbox_slice(asc, 5.0, 6.0) == slice(4, 4)
+
+
+def test_spatial_subset_bbox_with_descending_lat(tmp_path):
+    d = _new_downloader(tmp_path)
+    d.buffer_cells = 0
+    ds = xr.Dataset(
+        {"v": (("lat", "lon"), np.arange(25.0).reshape(5, 5))},
+        coords={"lat": [4.0, 3.0, 2.0, 1.0, 0.0], "lon": [0.0, 1.0, 2.0, 3.0, 4.0]},
+    )
+    subset = d._spatial_subset(ds, (0.5, 0.5, 2.5, 3.0), _catchment_gdf())
+    assert subset["lat"].values.tolist() == [3.0, 2.0, 1.0]
+    assert subset["lon"].values.tolist() == [1.0, 2.0]
+
+
+def test_spatial_subset_nearest_fallback_descending_lat(tmp_path):
+    d = _new_downloader(tmp_path)
+    d.buffer_cells = 0
+    ds = xr.Dataset(
+        {"v": (("lat", "lon"), np.arange(16.0).reshape(4, 4))},
+        coords={"lat": [3.0, 2.0, 1.0, 0.0], "lon": [0.0, 1.0, 2.0, 3.0]},
+    )
+    # Bounds fall between grid points, so the slice is empty and the fallback is used
+    subset = d._spatial_subset(ds, (1.2, 1.2, 1.4, 1.4), _catchment_gdf())
+    assert subset["lat"].values.tolist() == [1.0]
+    assert subset["lon"].values.tolist() == [1.0]
+
+
+def test_grid_resolution_is_cached_per_dataset(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    calls = []
+
+    def fake_resolution(coord, default=0.1):
+        calls.append(coord.name)
+        return 0.5
+
+    monkeypatch.setattr("src.core.downloader.get_grid_resolution", fake_resolution)
+    lon = xr.DataArray([0.0, 0.5], dims="lon", name="lon")
+    assert d._grid_resolution(lon, "climate/rain.zarr", default=0.0) == 0.5
+    assert d._grid_resolution(lon, "climate/rain.zarr", default=0.25) == 0.5
+    assert calls == ["lon"]
+
+    single = xr.DataArray([0.0], dims="lat", name="lat")
+    d._res_cache[("climate/rain.zarr", "lat")] = None
+    assert d._grid_resolution(single, "climate/rain.zarr", default=0.25) == 0.25
+
+
+def test_spatial_subset_mask_clips_bbox_window(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    d.mask_on_catchment = True
+    ds = xr.Dataset(
+        {"v": (("lat", "lon"), np.ones((10, 10))), "flag": ((), 1)},
+        coords={"lat": np.arange(10.0), "lon": np.arange(10.0), "spatial_ref": 0},
+        attrs={"title": "test"},
+    )
+    catchment = gpd.GeoDataFrame(
+        {"geometry": [Polygon([(2.6, 2.6), (4.4, 2.6), (4.4, 4.4), (2.6, 4.4)])]},
+        crs="EPSG:4326",
+    )
+
+    isel_sizes = []
+    original_isel = xr.Dataset.isel
+
+    def spy_isel(self, *args, **kwargs):
+        out = original_isel(self, *args, **kwargs)
+        isel_sizes.append(dict(out.sizes))
+        return out
+
+    monkeypatch.setattr(xr.Dataset, "isel", spy_isel)
+    subset = d._spatial_subset(ds, tuple(catchment.total_bounds), catchment)
+
+    # The first isel is the padded bounding-box window taken before clipping
+    assert isel_sizes[0] == {"lat": 4, "lon": 4}
+    assert subset["lon"].values.tolist() == [3.0, 4.0]
+    assert subset["lat"].values.tolist() == [3.0, 4.0]
+    assert not np.isnan(subset["v"].values).any()
+    assert set(subset.variables) == {"v", "lat", "lon"}
+    assert subset.attrs == {"title": "test"}
+
+
+def test_mask_to_catchment_descending_lat():
+    ds = xr.Dataset(
+        {"v": (("lat", "lon"), np.ones((4, 4)))},
+        coords={"lat": [3.0, 2.0, 1.0, 0.0], "lon": [0.0, 1.0, 2.0, 3.0]},
+    )
+    # Triangle touching the lower-left cells only
+    triangle = gpd.GeoDataFrame(
+        {"geometry": [Polygon([(0.6, 0.6), (2.4, 0.6), (0.6, 2.4)])]}, crs="EPSG:4326"
+    )
+    masked = PDPDataDownloader._mask_to_catchment(ds, triangle, "lon", "lat")
+    assert masked["lat"].values.tolist() == [2.0, 1.0]
+    assert masked["lon"].values.tolist() == [1.0, 2.0]
+    np.testing.assert_array_equal(np.isnan(masked["v"].values), [[False, True], [False, False]])
+
+
+def test_mask_to_catchment_numba_uses_cell_centres():
+    pytest.importorskip("numba")
+    from src.core.pnpoly import grid_mask
+
+    ds = xr.Dataset(
+        {"v": (("lat", "lon"), np.ones((4, 4)))},
+        coords={"lat": [3.0, 2.0, 1.0, 0.0], "lon": [0.0, 1.0, 2.0, 3.0]},
+    )
+    triangle = gpd.GeoDataFrame(
+        {"geometry": [Polygon([(0.6, 0.6), (2.4, 0.6), (0.6, 2.4)])]}, crs="EPSG:4326"
+    )
+    masked = PDPDataDownloader._mask_to_catchment(ds, triangle, "lon", "lat", use_numba=True)
+    assert masked["lat"].values.tolist() == [1.0]
+    assert masked["lon"].values.tolist() == [1.0]
+
+    # Polygon with a hole, checked against shapely on a dense grid
+    ring = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)], [[(3, 3), (7, 3), (7, 7), (3, 7)]])
+    gx = np.linspace(-0.95, 10.95, 35)
+    gy = np.linspace(10.9, -0.9, 30)
+    expected = shapely.contains_xy(ring, *np.meshgrid(gx, gy))
+    np.testing.assert_array_equal(grid_mask([ring], gx, gy), expected)
+
+
+def test_detect_dims_prefers_first_name_and_caches(tmp_path):
+    d = _new_downloader(tmp_path)
+    ds = xr.Dataset(coords={"lon": [0], "x": [0], "latitude": [0], "band": [0]})
+    assert d._detect_dims(ds, "a.zarr") == ("x", "latitude", None)
+    assert d._dims_cache["a.zarr"] == ("x", "latitude", None)
+
+    # A cached entry whose dimensions are gone is recomputed
+    renamed = ds.rename({"x": "east"})
+    assert d._detect_dims(renamed, "a.zarr") == ("lon", "latitude", None)
+
+
+def test_temporal_subset_selects_whole_periods(tmp_path):
+    d = _new_downloader(tmp_path)
+    times = pd.date_range("2000-01-01", "2000-03-31", freq="D")
+    ds = xr.Dataset({"v": (("time",), np.arange(times.size))}, coords={"time": times})
+
+    subset = d._temporal_subset(ds, ("2000-01-31", "2000-02"))
+    assert subset.sizes["time"] == 30
+    assert subset["time"].values[-1] == np.datetime64("2000-02-29")
+    assert subset.equals(ds.sel(time=slice("2000-01-31", "2000-02")))
+
+
+def test_temporal_subset_on_undecoded_time(tmp_path):
+    d = _new_downloader(tmp_path)
+    ds = xr.Dataset(
+        {"v": (("time",), np.arange(6.0))},
+        coords={"time": ("time", np.arange(6), {"units": "days since 2000-01-30"})},
+    )
+    subset = d._temporal_subset(ds, ("2000-01-31", "2000-02-02"))
+    assert subset["time"].values.tolist() == [1, 2, 3]
+
+    decoded = xr.decode_cf(subset)
+    assert str(decoded["time"].values[-1])[:10] == "2000-02-02"
+
+
+def test_process_dataset_decodes_after_subsetting(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    ds = xr.Dataset(
+        {"rain": (("time",), np.array([1, -1], dtype="int16"), {"_FillValue": -1})},
+        coords={"time": ("time", [0, 1], {"units": "days since 2000-01-01"})},
+    )
+    monkeypatch.setattr(d, "_spatial_subset", lambda ds, bounds, c, **kwargs: ds)
+    out = d.process_dataset(ds, "climate", "rain")
+    assert np.isnan(out["rain"].values[1])
+    assert np.issubdtype(out["time"].dtype, np.datetime64)
+
+
 def test_log_download_and_download_all(monkeypatch, tmp_path):
     d = _new_downloader(tmp_path)
     saved = {}
-    monkeypatch.setattr(d, "_save_download_history", lambda: saved.__setitem__("ok", True))
+    monkeypatch.setattr(d, "_append_download_history", lambda e: saved.__setitem__("ok", True))
 
     d._log_download(
         "climate", "rain", d.get_dataset_info("climate", "rain"), Path("x.nc"), (0, 0, 1, 1), None
@@ -259,3 +687,23 @@ def test_log_download_and_download_all(monkeypatch, tmp_path):
     monkeypatch.setattr(d, "download_dataset", fake_download)
     d.download_all()
     assert calls["count"] == 1
+
+
+def test_download_all_runs_every_dataset(monkeypatch, tmp_path):
+    d = _new_downloader(tmp_path)
+    d.dataset_catalog = {"climate": {"rain": {}, "temp": {}}, "soil": {"clay": {}}}
+    monkeypatch.setattr(d, "_prefetch_metadata", lambda datasets: None)
+    downloaded = []
+
+    def fake_download(category, subcategory, time_range=None):
+        downloaded.append((category, subcategory, time_range))
+        if subcategory == "temp":
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(d, "download_dataset", fake_download)
+    d.download_all(time_range=("2000", "2001"), max_workers=2)
+    assert sorted(downloaded) == [
+        ("climate", "rain", ("2000", "2001")),
+        ("climate", "temp", ("2000", "2001")),
+        ("soil", "clay", ("2000", "2001")),
+    ]
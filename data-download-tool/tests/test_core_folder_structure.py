@@ -1,4 +1,6 @@
 import json
+import logging
+import os
 
 from src.core.folder_structure import PDPFolderStructure, create_pdp_folders
 
@@ -14,6 +16,13 @@ def test_create_structure_and_metadata(tmp_path):
     assert metadata["project_name"] == "PHISHES Digital Platform Project"
 
 
+def test_metadata_file_without_orjson(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.core.folder_structure.orjson", None)
+    PDPFolderStructure(base_path=tmp_path).create_structure()
+    metadata = json.loads((tmp_path / ".pdp_metadata.json").read_text(encoding="utf-8"))
+    assert metadata["structure_version"] == "1.0"
+
+
 def test_get_dataset_path(tmp_path):
     manager = PDPFolderStructure(base_path=tmp_path)
     path = manager.get_dataset_path("climate", "precipitation")
@@ -40,3 +49,41 @@ def test_create_pdp_folders_convenience(tmp_path):
     out = create_pdp_folders(base_path=tmp_path)
     assert out == tmp_path
     assert (tmp_path / "logs").exists()
+
+
+def test_list_structure_matches_os_walk(tmp_path):
+    (tmp_path / "data" / "climate" / "rain").mkdir(parents=True)
+    (tmp_path / "data" / "climate" / "rain" / "rain.nc").write_text("", encoding="utf-8")
+    manager = PDPFolderStructure(base_path=tmp_path)
+
+    expected = sorted(
+        os.path.relpath(os.path.join(root, name), tmp_path)
+        for root, dirnames, _ in os.walk(tmp_path)
+        for name in dirnames
+    )
+    assert manager.list_structure() == expected
+
+
+def test_create_structure_keeps_existing_readme(tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "README.md").write_text("custom", encoding="utf-8")
+    structure = {"logs": {}, "a": {"b": {"c": {}}}}
+    PDPFolderStructure(base_path=tmp_path, custom_structure=structure).create_structure()
+
+    assert (tmp_path / "logs" / "README.md").read_text(encoding="utf-8") == "custom"
+    assert (tmp_path / "a" / "b" / "c" / "README.md").exists()
+    assert not (tmp_path / "a" / "README.md").exists()
+
+
+def test_create_structure_logs_one_summary(tmp_path, caplog):
+    structure = {"a": {"b": {}}, "logs": {}}
+    with caplog.at_level(logging.INFO, logger="src.core.folder_structure"):
+        PDPFolderStructure(base_path=tmp_path, custom_structure=structure).create_structure()
+    assert sum("Created 3 directories" in message for message in caplog.messages) == 1
+
+
+def test_create_readme_without_create_structure(tmp_path):
+    PDPFolderStructure(base_path=tmp_path)._create_readme(tmp_path, "raw_data")
+    text = (tmp_path / "README.md").read_text(encoding="utf-8")
+    assert "Created: None" not in text
+    assert text.splitlines()[-1].startswith("Created: 20")
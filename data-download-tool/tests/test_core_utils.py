@@ -1,8 +1,13 @@
 from pathlib import Path
+import asyncio
+import json
+import mmap
+import sys
 
 import numpy as np
 import pytest
 import xarray as xr
+import zarr
 
 from src.core import utils
 
@@ -16,6 +21,12 @@ def test_get_grid_resolution_default_for_single_value():
     assert utils.get_grid_resolution(np.array([42.0]), default=0.5) == 0.5
 
 
+def test_get_grid_resolution_with_lazy_dataarray():
+    coords = xr.DataArray(np.array([50.5, 50.0, 49.5]), dims="lat").chunk(1)
+    assert utils.get_grid_resolution(coords) == pytest.approx(0.5)
+    assert utils.get_grid_resolution(xr.DataArray(1.0), default=0.25) == 0.25
+
+
 def test_remove_path_with_retry_missing_path(tmp_path):
     assert utils.remove_path_with_retry(tmp_path / "does-not-exist") is False
 
@@ -27,33 +38,290 @@ def test_remove_path_with_retry_file(tmp_path):
     assert not file_path.exists()
 
 
+def test_remove_path_with_retry_directory(tmp_path):
+    tree = tmp_path / "store.zarr"
+    (tree / "var" / "0").mkdir(parents=True)
+    (tree / "var" / "0" / "0.0").write_bytes(b"x")
+    (tree / ".zattrs").write_text("{}", encoding="utf-8")
+    assert utils.remove_path_with_retry(tree) is True
+    assert not tree.exists()
+
+
+def test_parallel_rmtree_removes_nested_tree(tmp_path):
+    tree = tmp_path / "store.zarr"
+    for name in ("a", "b"):
+        (tree / name / "0").mkdir(parents=True)
+        for i in range(5):
+            (tree / name / "0" / f"{i}.0").write_bytes(b"x")
+    utils._parallel_rmtree(tree, max_workers=2, batch_size=2)
+    assert not tree.exists()
+
+
+def test_remove_path_with_retry_refuses_symlinked_store(tmp_path):
+    target = tmp_path / "other_disk" / "rain.zarr"
+    (target / "rain" / "0").mkdir(parents=True)
+    (target / "rain" / "0" / "0.0").write_bytes(b"x")
+    link = tmp_path / "rain.zarr"
+    try:
+        link.symlink_to(target, target_is_directory=True)
+    except OSError:
+        pytest.skip("symlinks are not available")
+
+    with pytest.raises(OSError, match="symbolic link"):
+        utils.remove_path_with_retry(link)
+    with pytest.raises(OSError, match="symbolic link"):
+        utils._parallel_rmtree(link)
+    assert (target / "rain" / "0" / "0.0").exists()
+
+
+def test_retry_handler_retries_failed_entry(monkeypatch, capsys):
+    sleeps = []
+    monkeypatch.setattr(utils.time, "sleep", sleeps.append)
+    attempts = []
+
+    def flaky_unlink(path):
+        attempts.append(path)
+        if len(attempts) < 2:
+            raise PermissionError("locked")
+
+    handler = utils._make_retry_handler(max_retries=3, retry_delays=[0.0])
+    monkeypatch.setattr(utils.os, "unlink", flaky_unlink)
+    handler(utils.os.unlink, "locked.bin", PermissionError(13, "Permission denied"))
+    assert attempts == ["locked.bin", "locked.bin"]
+    assert "[Errno 13] Permission denied" in capsys.readouterr().out
+
+    # A missing entry is not retried
+    attempts.clear()
+    sleeps.clear()
+    handler(utils.os.unlink, "gone.bin", FileNotFoundError(2, "No such file"))
+    assert attempts == [] and sleeps == []
+
+    attempts.clear()
+    handler = utils._make_retry_handler(max_retries=1, retry_delays=[0.0])
+    with pytest.raises(PermissionError):
+        handler(utils.os.unlink, "locked.bin", PermissionError("locked"))
+
+
+def test_get_transformer_is_cached():
+    transformer = utils.get_transformer("EPSG:4326", "EPSG:3035")
+    assert utils.get_transformer("EPSG:4326", "EPSG:3035") is transformer
+    x, y = transformer.transform(10.0, 52.0)
+    assert x == pytest.approx(4321000.0)
+    assert y == pytest.approx(3210000.0)
+
+
 def test_build_dataset_path_lowercases_format():
     path = utils.build_dataset_path("base", "climate", "precip", "NC")
     assert path == Path("base") / "data" / "climate" / "precip" / "precip.nc"
 
 
+def test_get_dataset_encoding_per_format():
+    ds = xr.Dataset(
+        {
+            "rain": (("time", "lat", "lon"), np.ones((3, 300, 10), dtype="float32")),
+            "crs": ((), 0),
+        }
+    )
+    nc = utils.get_dataset_encoding(ds, "NC")
+    assert nc == {"rain": {"zlib": False, "chunksizes": (3, 256, 10)}}
+    compressed = utils.get_dataset_encoding(ds, "nc", compression_level=4)
+    assert compressed["rain"] == {"zlib": True, "complevel": 4, "chunksizes": (3, 256, 10)}
+    # 256 x 10 float32 cells are 10 KiB per time step, so a 20 KiB cap fits two steps
+    capped = utils.get_dataset_encoding(ds, "nc", max_chunk_bytes=20 * 1024)
+    assert capped["rain"]["chunksizes"] == (2, 256, 10)
+    dated = utils.get_dataset_encoding(
+        ds.rename(time="date"), "nc", max_chunk_bytes=20 * 1024, time_dim="date"
+    )
+    assert dated["rain"]["chunksizes"] == (2, 256, 10)
+
+    zarr_enc = utils.get_dataset_encoding(ds, "zarr")
+    assert set(zarr_enc) == {"rain", "crs"}
+    assert utils.get_dataset_encoding(ds, "dfs2") == {}
+
+
+@pytest.mark.parametrize("output_format", ["nc", "zarr"])
+def test_get_dataset_encoding_keeps_packing(tmp_path, output_format):
+    packed = xr.Dataset(
+        {"rain": (("lat", "lon"), np.array([[10, -9999], [25, 3]], dtype="int16"))},
+        coords={"lat": [0.0, 1.0], "lon": [0.0, 1.0]},
+    )
+    packed["rain"].attrs.update({"scale_factor": 0.1, "_FillValue": np.int16(-9999)})
+    decoded = xr.decode_cf(packed)
+    assert decoded["rain"].dtype == np.float64
+
+    encoding = utils.get_dataset_encoding(decoded, output_format)
+    path = tmp_path / f"rain.{output_format}"
+    if output_format == "nc":
+        decoded.to_netcdf(path, engine="h5netcdf", encoding=encoding)
+    else:
+        decoded.to_zarr(path, zarr_format=2, encoding=encoding)
+
+    with xr.open_dataset(
+        path, decode_cf=False, engine=None if output_format == "nc" else "zarr"
+    ) as raw:
+        assert raw["rain"].dtype == np.int16
+        assert raw["rain"].attrs["scale_factor"] == pytest.approx(0.1)
+        assert raw["rain"].attrs["_FillValue"] == -9999
+        assert raw["rain"].values.tolist() == [[10, -9999], [25, 3]]
+
+
+def test_get_write_chunks_groups_time_steps():
+    ds = xr.Dataset({"rain": (("time", "lat", "lon"), np.ones((1000, 300, 16), dtype="float32"))})
+    # 256 x 16 float32 cells are 16 KiB per step, so 1 MiB needs 64 steps
+    assert utils.get_write_chunks(ds) == {"lat": 256, "lon": 16, "time": 64}
+    assert utils.get_write_chunks(ds.isel(time=slice(0, 10)))["time"] == 10
+    assert utils.get_write_chunks(ds.isel(time=0)) == {"lat": 256, "lon": 16}
+
+    dated = ds.rename(time="date")
+    assert utils.get_write_chunks(dated, time_dim="date") == {"lat": 256, "lon": 16, "date": 64}
+
+
 def test_open_dataset_any_zarr(monkeypatch, tmp_path):
     zarr_dir = tmp_path / "ds.zarr"
     zarr_dir.mkdir()
 
     called = {}
+    fake_ds = xr.Dataset()
 
-    def fake_open_zarr(path, consolidated=True):
-        called["args"] = (path, consolidated)
-        return "zarr_ds"
+    def fake_open_zarr(path, consolidated=False, chunks=None):
+        called["args"] = (path, consolidated, chunks)
+        return fake_ds
 
     monkeypatch.setattr(utils.xr, "open_zarr", fake_open_zarr)
-    result = utils.open_dataset_any(zarr_dir)
+    result = utils.open_dataset_any(zarr_dir, cache=False)
+    assert result is fake_ds
+    assert called["args"] == (zarr_dir, None, {})
+
+
+def test_is_uncompressed_zarr(tmp_path):
+    store = tmp_path / "ds.zarr"
+    store.mkdir()
+    assert utils._is_uncompressed_zarr(store) is False
+
+    metadata = {
+        "metadata": {
+            ".zgroup": {"zarr_format": 2},
+            "v/.zarray": {"compressor": None, "filters": None},
+        }
+    }
+    (store / ".zmetadata").write_text(json.dumps(metadata), encoding="utf-8")
+    assert utils._is_uncompressed_zarr(store) is True
+
+    metadata["metadata"]["w/.zarray"] = {"compressor": {"id": "blosc"}, "filters": None}
+    (store / ".zmetadata").write_text(json.dumps(metadata), encoding="utf-8")
+    assert utils._is_uncompressed_zarr(store) is False
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="stores are not memory-mapped on Windows")
+@pytest.mark.skipif(int(zarr.__version__.split(".")[0]) < 3, reason="uses the zarr 3 store API")
+def test_open_dataset_any_memory_maps_uncompressed_zarr(monkeypatch, tmp_path):
+    path = tmp_path / "ds.zarr"
+    ds = xr.Dataset({"v": (("lat", "lon"), np.arange(12.0).reshape(3, 4))})
+    ds.to_zarr(path, zarr_format=2, consolidated=True, encoding={"v": {"compressors": None}})
+
+    # Chunk bytes are a view of the mapped file rather than a copy
+    store = utils._memory_mapped_store(path)
+    chunk = asyncio.run(store.get("v/0.0"))
+    view = chunk.as_numpy_array()
+    while not isinstance(view, memoryview):
+        view = view.base
+    assert isinstance(view.obj, mmap.mmap)
+
+    stores = []
+    original_open_zarr = utils.xr.open_zarr
+
+    def spy_open_zarr(store, **kwargs):
+        stores.append(store)
+        return original_open_zarr(store, **kwargs)
+
+    monkeypatch.setattr(utils.xr, "open_zarr", spy_open_zarr)
+    opened = utils.open_dataset_any(path, prefetch_coords=False)
+    np.testing.assert_array_equal(opened["v"].values, ds["v"].values)
+    assert type(stores[0]).__name__.startswith("MemoryMapped")
+
+
+def test_open_dataset_any_tensorstore_falls_back(monkeypatch, tmp_path):
+    zarr_dir = tmp_path / "ds.zarr"
+    zarr_dir.mkdir()
+
+    monkeypatch.setitem(sys.modules, "xarray_tensorstore", None)
+    monkeypatch.setattr(
+        utils.xr, "open_zarr", lambda path, consolidated=True, chunks=None: "zarr_ds"
+    )
+    result = utils.open_dataset_any(
+        zarr_dir, use_tensorstore=True, prefetch_coords=False, cache=False
+    )
     assert result == "zarr_ds"
-    assert called["args"] == (zarr_dir, True)
 
 
 def test_open_dataset_any_netcdf(monkeypatch, tmp_path):
     nc_file = tmp_path / "a.nc"
     nc_file.write_text("", encoding="utf-8")
 
-    monkeypatch.setattr(utils.xr, "open_dataset", lambda p, engine=None: (p, engine))
-    assert utils.open_dataset_any(nc_file) == (nc_file, "netcdf4")
+    monkeypatch.setattr(
+        utils.xr, "open_dataset", lambda p, engine=None, chunks=None: (p, engine, chunks)
+    )
+    result = utils.open_dataset_any(nc_file, prefetch_coords=False, cache=False)
+    assert result == (nc_file, "netcdf4", {})
+
+
+def test_open_dataset_any_prefetches_non_index_coords(tmp_path):
+    ds = xr.Dataset(
+        {"v": (("lat", "lon"), np.ones((2, 2)))},
+        coords={"lat": [0.0, 1.0], "lon": [0.0, 1.0], "height": ((), 2.0)},
+    )
+    ds.to_netcdf(tmp_path / "a.nc")
+
+    opened = utils.open_dataset_any(tmp_path / "a.nc")
+    assert float(opened["height"]) == 2.0
+    assert opened["height"].chunks is None
+
+
+def test_open_dataset_any_reuses_unchanged_file(monkeypatch, tmp_path):
+    nc_file = tmp_path / "cached.nc"
+    nc_file.write_text("", encoding="utf-8")
+    calls = []
+
+    def fake_open_dataset(p, engine=None, chunks=None):
+        calls.append(p)
+        return xr.Dataset({"v": ("x", np.arange(2.0))})
+
+    monkeypatch.setattr(utils.xr, "open_dataset", fake_open_dataset)
+    first = utils.open_dataset_any(nc_file, cache=True)
+    first["extra"] = first["v"] * 2
+    first["v"].values[:] = -1.0
+    second = utils.open_dataset_any(nc_file, cache=True)
+    assert len(calls) == 1
+    assert "extra" not in second
+    assert second["v"].values.tolist() == [0.0, 1.0]
+
+    utils.cleanup_existing_dataset(tmp_path / "missing")
+    utils.open_dataset_any(nc_file, cache=True)
+    assert len(calls) == 2
+
+    utils.open_dataset_any(nc_file)
+    assert len(calls) == 3
+
+
+def test_remove_path_with_retry_evicts_only_that_path(monkeypatch, tmp_path):
+    collected = []
+    monkeypatch.setattr(utils.gc, "collect", lambda: collected.append(True))
+    utils._evict_open_datasets()
+    for name in ("cached.nc", "kept.nc"):
+        xr.Dataset({"v": ("x", np.arange(2.0))}).to_netcdf(tmp_path / name)
+        utils.open_dataset_any(tmp_path / name, cache=True)
+    assert len(utils._open_dataset_cache) == 2
+
+    assert utils.remove_path_with_retry(tmp_path / "cached.nc") is True
+    assert not (tmp_path / "cached.nc").exists()
+    assert [key[0] for key in utils._open_dataset_cache] == [str(tmp_path / "kept.nc")]
+    assert collected == [True]
+
+    # Nothing cached under the removed path, so no collection
+    (tmp_path / "other.nc").write_text("", encoding="utf-8")
+    utils.remove_path_with_retry(tmp_path / "other.nc")
+    assert collected == [True]
+    utils._evict_open_datasets()
 
 
 def test_open_dataset_any_dfs2(monkeypatch, tmp_path):
@@ -92,6 +360,16 @@ def test_cleanup_existing_dataset_closes_and_removes(monkeypatch, tmp_path):
     assert called["removed"]
 
 
+def test_cleanup_existing_dataset_skips_gc_when_nothing_closed(monkeypatch, tmp_path):
+    collected = []
+    utils._evict_open_datasets()
+    monkeypatch.setattr(utils.gc, "collect", lambda: collected.append(True))
+    monkeypatch.setattr(utils, "remove_path_with_retry", lambda _: False)
+
+    utils.cleanup_existing_dataset(tmp_path / "anything", namespace={"ds": None})
+    assert collected == []
+
+
 def test_guess_data_variable_default_filter():
     ds = xr.Dataset(
         {
@@ -101,8 +379,12 @@ def test_guess_data_variable_default_filter():
         }
     )
     assert utils.guess_data_variable(ds) == "rain"
+    assert utils.guess_data_variable(ds, filter_vars="spatial_ref") == "rain"
+    assert utils.guess_data_variable(ds, filter_vars=None) == "spatial_ref"
 
 
 def test_guess_data_variable_raises_for_non_dataset():
     with pytest.raises(ValueError):
         utils.guess_data_variable(np.array([1, 2, 3]))
+    with pytest.raises(ValueError):
+        utils.guess_data_variable(xr.Dataset())
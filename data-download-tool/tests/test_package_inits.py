@@ -8,6 +8,14 @@ def test_analysis_exports():
     assert callable(analysis.compute_anomalies)
 
 
+def test_analysis_lazy_exports():
+    assert sorted(analysis.__dir__()) == sorted(analysis.__all__)
+    for name in analysis.__all__:
+        assert getattr(analysis, name) is not None
+    with pytest.raises(AttributeError):
+        analysis.__getattr__("does_not_exist")
+
+
 def test_core_dir_and_getattr():
     names = core.__dir__()
     assert "PDPDataDownloader" in names
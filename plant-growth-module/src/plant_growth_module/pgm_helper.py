@@ -2,8 +2,14 @@
 
 import warnings
 import numpy as np
+import pandas as pd
 import mikeio
 
+try:
+    import numba
+except ImportError:  # optional, installed with the "fast" extra
+    numba = None
+
 # Column name variants for land use mapping
 VAL_COLS = ["CODE", "VALUE"]
 CLASS_COLS = ["CLASS", "SPECIESID"]
@@ -16,6 +22,9 @@ KEY_COLS = ["CONSTANT", "VARIABLE", "KEY", "NAME", "PARAM", "PARAMETER"]
 TEMPLATE_COLS = ["TEMPLATE", "SCOPE", "SOURCE"]
 TYPE_COLS = ["TYPE", "MAPTYPE", "MAP"]
 
+# Grids with at least this many cells are mapped with the Numba kernel when available
+NUMBA_MIN_CELLS = 1_000_000
+
 
 # State variables source dictionary (to be extended as PGM evolves)
 STATE_VARIABLE_SCOPE = {
@@ -58,10 +67,8 @@ def find_col(df, cols):
     str or None
         Name of first matching column, or None if not found
     """
-    for col in df.columns:
-        if any(col.lower() == c.lower() for c in cols):
-            return col
-    return None
+    wanted = {c.lower() for c in cols}
+    return next((col for col in df.columns if col.lower() in wanted), None)
 
 
 def confirm_columns(column_dict, auto_confirm=False, context="", multi_files=True):
@@ -123,6 +130,97 @@ def confirm_columns(column_dict, auto_confirm=False, context="", multi_files=Tru
         return False
 
 
+if numba is not None:
+
+    @numba.njit(parallel=True, cache=True)
+    def _map_codes_kernel(landuse, codes, values):
+        """Binary-search each cell's code in ``codes`` and write its float32 value."""
+        out = np.empty(landuse.size, dtype=np.float32)
+        n_codes = codes.size
+        for i in numba.prange(landuse.size):
+            code = landuse[i]
+            lo, hi = 0, n_codes
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if codes[mid] < code:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < n_codes and codes[lo] == code:
+                out[i] = values[lo]
+            else:
+                out[i] = 0.0
+        return out
+
+else:
+    _map_codes_kernel = None
+
+
+def map_codes_to_values(landuse_data, codes, values):
+    """Look up a value for every cell of a land use grid.
+
+    Parameters:
+    -----------
+    landuse_data : np.ndarray
+        Land use grid data (codes)
+    codes : sequence
+        Land use codes to map
+    values : sequence of float
+        Value for each entry in ``codes``
+
+    Returns:
+    --------
+    np.ndarray
+        float32 grid with the mapped values, and 0 for cells whose code is not listed
+    """
+    codes = np.asarray(codes)
+    values = np.asarray(values, dtype=np.float32)
+    if codes.dtype.kind not in "iuf" and landuse_data.dtype.kind in "iuf":
+        # Mixed-type code columns (e.g. from Excel) come out as strings and would never
+        # match a numeric grid: keep the codes that read as numbers
+        numeric = pd.to_numeric(codes.astype(object), errors="coerce").astype(
+            np.float64
+        )
+        keep = ~np.isnan(numeric)
+        codes, values = numeric[keep], values[keep]
+        if np.array_equal(codes, np.round(codes)):
+            codes = codes.astype(np.int64)
+
+    if codes.size == 0:
+        return np.zeros(landuse_data.shape, dtype=np.float32)
+
+    order = np.argsort(codes, kind="stable")
+    codes, values = codes[order], values[order]
+
+    # Large numeric grids: fused lookup, zero-fill and cast in one parallel pass
+    if (
+        _map_codes_kernel is not None
+        and landuse_data.size >= NUMBA_MIN_CELLS
+        and landuse_data.dtype.kind in "iuf"
+        and codes.dtype.kind in "iuf"
+    ):
+        flat = np.ascontiguousarray(landuse_data).ravel()
+        return _map_codes_kernel(flat, codes, values).reshape(landuse_data.shape)
+
+    # Small non-negative integer codes: index a dense lookup table directly
+    if (
+        np.issubdtype(landuse_data.dtype, np.integer)
+        and np.issubdtype(codes.dtype, np.integer)
+        and codes[0] >= 0
+        and codes[-1] <= np.iinfo(np.uint16).max
+    ):
+        lut = np.zeros(int(codes[-1]) + 1, dtype=np.float32)
+        lut[codes] = values
+        in_range = (landuse_data >= 0) & (landuse_data < lut.size)
+        return np.where(
+            in_range, lut[np.clip(landuse_data, 0, lut.size - 1)], np.float32(0)
+        )
+
+    # General case (e.g. float grids read from DFS2): binary search in the sorted codes
+    idx = np.minimum(np.searchsorted(codes, landuse_data), codes.size - 1)
+    return np.where(codes[idx] == landuse_data, values[idx], np.float32(0))
+
+
 def generate_dfs2_map(
     landuse_data,
     landuse_ds,
@@ -153,11 +251,8 @@ def generate_dfs2_map(
     """
     default_species_values = default_species_values or {}
 
-    # Create output grid initialized with zeros
-    output_grid = np.zeros_like(landuse_data, dtype=np.float32)
-
-    # Map each land use code to its corresponding species value
-    # Process each code separately to prevent value overwrites
+    # Collect the value for each land use code (codes without a value stay zero)
+    codes, values = [], []
     for code, species in code_to_species.items():
         if species in species_values:
             value = species_values[species]
@@ -165,9 +260,11 @@ def generate_dfs2_map(
             value = default_species_values[species]
         else:
             continue
+        codes.append(code)
+        values.append(value)
 
-        mask = landuse_data == code
-        output_grid[mask] = value
+    # Map all codes in a single pass over the land use grid
+    output_grid = map_codes_to_values(np.asarray(landuse_data), codes, values)
 
     # Create DFS2 with same geometry as input
     # Expand dimensions to match mikeio's expected shape (time, y, x)
@@ -11,6 +11,7 @@ def test_find_col_case_insensitive():
     df = pd.DataFrame({"Code": [1], "SpeciesId": ["A"]})
     assert pgm_helper.find_col(df, ["CODE"]) == "Code"
     assert pgm_helper.find_col(df, ["CLASS"]) is None
+    assert pgm_helper.find_col(df, ["SPECIESID", "CODE"]) == "Code"
 
 
 def test_confirm_columns_auto_confirm():
@@ -66,6 +67,44 @@ def test_generate_dfs2_map(monkeypatch, tmp_path):
 
     assert called["output"] == output
     assert called["kwargs"]["data"].shape == (1, 2, 2)
+    np.testing.assert_array_equal(called["kwargs"]["data"][0], [[10, 20], [20, 30]])
+
+
+def test_map_codes_to_values_int_and_float_grids():
+    codes, values = [3, 1, 7], [30.0, 10.0, 70.0]
+    expected = np.array([[10, 0, 30], [0, 70, 0]], dtype=np.float32)
+
+    int_grid = np.array([[1, 2, 3], [-1, 7, 9]])
+    out = pgm_helper.map_codes_to_values(int_grid, codes, values)
+    assert out.dtype == np.float32
+    np.testing.assert_array_equal(out, expected)
+
+    float_grid = np.array([[1.0, 2.5, 3.0], [np.nan, 7.0, 9.0]], dtype=np.float32)
+    np.testing.assert_array_equal(
+        pgm_helper.map_codes_to_values(float_grid, codes, values), expected
+    )
+
+
+def test_map_codes_to_values_mixed_type_codes():
+    grid = np.array([[1, 2], [3, 4]])
+    out = pgm_helper.map_codes_to_values(grid, [1, "x", "3"], [10.0, 20.0, 30.0])
+    np.testing.assert_array_equal(out, [[10, 0], [30, 0]])
+
+    out = pgm_helper.map_codes_to_values(grid, ["x"], [20.0])
+    np.testing.assert_array_equal(out, np.zeros((2, 2)))
+
+
+@pytest.mark.skipif(pgm_helper.numba is None, reason="numba not installed")
+def test_map_codes_to_values_numba_kernel_matches_numpy(monkeypatch):
+    rng = np.random.default_rng(0)
+    grid = rng.integers(-2, 12, size=(40, 30)).astype(np.float32)
+    codes, values = [1, 4, 9, 11], [1.5, 4.5, 9.5, 11.5]
+
+    expected = pgm_helper.map_codes_to_values(grid, codes, values)
+    monkeypatch.setattr(pgm_helper, "NUMBA_MIN_CELLS", 0)
+    np.testing.assert_array_equal(
+        pgm_helper.map_codes_to_values(grid, codes, values), expected
+    )
 
 
 def test_split_lu_mapping_by_apply():